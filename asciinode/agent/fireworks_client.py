@@ -3,11 +3,31 @@ import os
 from typing import Any, Dict, List, Mapping, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 DEFAULT_MODEL = "accounts/sentientfoundation/models/dobby-unhinged-llama-3-3-70b-new"
 DEFAULT_URL = "https://api.fireworks.ai/inference/v1/chat/completions"
 
+_SESSION: Optional[requests.Session] = None
+
+
+def _dumps(payload: Mapping[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(content: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
 
 class FireworksError(RuntimeError):
     pass
@@ -22,6 +42,15 @@ def _resolve_api_key(explicit_key: Optional[str]) -> str:
     return api_key
 
 
+def _get_session() -> requests.Session:
+    global _SESSION
+    if _SESSION is None:
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        _SESSION = session
+    return _SESSION
+
+
 def chat_completion(
     messages: List[Mapping[str, Any]],
     *,
@@ -54,14 +83,16 @@ def chat_completion(
         "Authorization": f"Bearer {_resolve_api_key(api_key)}",
     }
 
-    response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=timeout)
+    response = _get_session().post(
+        url, headers=headers, data=_dumps(payload), timeout=timeout
+    )
     if response.status_code >= 400:
         raise FireworksError(
             f"Fireworks API error {response.status_code}: {response.text.strip() or 'no message'}"
         )
 
     try:
-        data = response.json()
+        data = _loads(response.content)
     except json.JSONDecodeError as exc:
         raise FireworksError(f"Failed to decode Fireworks response: {exc}") from exc
 
@@ -1,5 +1,6 @@
 import json
 import re
+from functools import lru_cache
 from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
 
 from ..diagram_components.core import Position
@@ -11,6 +12,15 @@ from .schema import DiagramInstruction, EdgeInstruction, NodeInstruction
 Message = Mapping[str, Any]
 ChatClient = Callable[..., Dict[str, Any]]
 
+_FENCE_RE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_JSON_TOKEN_RE = re.compile(r'[{}"\\]')
+
+_POSITION_DISPATCH: Dict[Position, Callable[..., Node]] = {
+    Position.TOP: Node.add_top,
+    Position.BOTTOM: Node.add_bottom,
+    Position.LEFT: Node.add_left,
+    Position.RIGHT: Node.add_right,
+}
 
 _SCHEMA_TEXT = (
     '{"title": optional string, '
@@ -57,31 +67,55 @@ def _build_diagram(instruction: DiagramInstruction) -> Diagram:
 
 
 def _attach_node(parent: Node, instruction: NodeInstruction) -> Node:
-    if instruction.position == Position.TOP:
-        return parent.add_top(instruction.text)
-    if instruction.position == Position.BOTTOM:
-        return parent.add_bottom(instruction.text)
-    if instruction.position == Position.LEFT:
-        return parent.add_left(instruction.text)
-    if instruction.position == Position.RIGHT:
-        return parent.add_right(instruction.text)
-    return parent.add(instruction.text)
+    attach = _POSITION_DISPATCH.get(instruction.position, Node.add)
+    return attach(parent, instruction.text)
+
+
+def _extract_json_object(content: str) -> Optional[str]:
+    start = content.find("{")
+    if start == -1:
+        return None
+    depth = 0
+    in_string = False
+    escaped_index = -1
+    for match in _JSON_TOKEN_RE.finditer(content, start):
+        index = match.start()
+        if index == escaped_index:
+            continue
+        char = match.group()
+        if in_string:
+            if char == "\\":
+                escaped_index = index + 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return content[start : index + 1]
+    return None
 
 
 def _parse_instruction(content: str) -> DiagramInstruction:
-    content = content.strip()
+    return _parse_instruction_cached(content.strip())
+
+
+@lru_cache(maxsize=128)
+def _parse_instruction_cached(content: str) -> DiagramInstruction:
     if not content:
         raise ValueError("LLM response is empty.")
 
-    content = re.sub(r"```(?:json)?", "", content, flags=re.IGNORECASE).strip()
+    if "```" in content:
+        content = _FENCE_RE.sub("", content).strip()
 
     try:
         data = json.loads(content)
     except json.JSONDecodeError as exc:
-        start = content.find("{")
-        end = content.rfind("}")
-        if start != -1 and end != -1 and end > start:
-            candidate = content[start : end + 1]
+        candidate = _extract_json_object(content)
+        if candidate is not None:
             try:
                 data = json.loads(candidate)
             except json.JSONDecodeError:
@@ -123,3 +157,6 @@ def generate_diagram(
 
     instruction = _parse_instruction(content)
     return _build_diagram(instruction)
+
+
+generate_diagram.cache_clear = _parse_instruction_cached.cache_clear
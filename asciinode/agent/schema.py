@@ -1,5 +1,5 @@
-from dataclasses import dataclass, field
-from typing import Dict, Iterable, List, Optional
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
 
 from ..diagram_components.core import Position
 
@@ -15,10 +15,13 @@ _POSITION_ALIASES: Dict[str, Position] = {
 def _coerce_position(value: Optional[str]) -> Position:
     if not value:
         return Position.BOTTOM
+    position = _POSITION_ALIASES.get(value)
+    if position is not None:
+        return position
     return _POSITION_ALIASES.get(value.lower(), Position.BOTTOM)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class NodeInstruction:
     node_id: str
     text: str
@@ -38,7 +41,7 @@ class NodeInstruction:
         return cls(node_id=node_id, text=text, parent_id=parent_id, position=position)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class EdgeInstruction:
     source_id: str
     target_id: str
@@ -60,10 +63,10 @@ class EdgeInstruction:
         return cls(source_id=source, target_id=target, label=label, style=style)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DiagramInstruction:
-    nodes: List[NodeInstruction] = field(default_factory=list)
-    edges: List[EdgeInstruction] = field(default_factory=list)
+    nodes: Tuple[NodeInstruction, ...] = ()
+    edges: Tuple[EdgeInstruction, ...] = ()
     title: Optional[str] = None
 
     @classmethod
@@ -74,11 +77,11 @@ class DiagramInstruction:
         if not isinstance(nodes_payload, Iterable):
             raise ValueError("Diagram instruction must include iterable 'nodes'.")
 
-        nodes = [NodeInstruction.from_dict(node) for node in nodes_payload]
+        nodes = tuple(NodeInstruction.from_dict(node) for node in nodes_payload)
 
-        edges: List[EdgeInstruction] = []
+        edges: Tuple[EdgeInstruction, ...] = ()
         if isinstance(edges_payload, Iterable):
-            edges = [EdgeInstruction.from_dict(edge) for edge in edges_payload]
+            edges = tuple(EdgeInstruction.from_dict(edge) for edge in edges_payload)
 
         title = payload.get("title")
         if title is not None:
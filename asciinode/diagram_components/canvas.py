@@ -1,34 +1,76 @@
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 
 from ..errors import LayoutOverflowError
 
 
+def _overflow_error(x: int, y: int) -> LayoutOverflowError:
+    return LayoutOverflowError(
+        "Diagram content exceeds canvas bounds at "
+        f"({x}, {y}). Increase canvas size via Diagram(..., "
+        "canvas_width=..., canvas_height=...)."
+    )
+
+
 class Canvas:
 
     def __init__(self, width: int = 200, height: int = 100):
         self.width = width
         self.height = height
-        self.grid = [[" " for _ in range(width)] for _ in range(height)]
-        self.cell_widths = [[1 for _ in range(width)] for _ in range(height)]
+        size = width * height
+        self.grid: Union[bytearray, List[str]] = bytearray(b" ") * size
+        self._ascii = True
+        self.cell_widths = bytearray(b"\x01") * size
         self.min_x = width
         self.max_x = 0
         self.min_y = height
         self.max_y = 0
-        self.markup: Dict[Tuple[int, int], Dict[str, List[str]]] = {}
+        self.markup: Dict[Tuple[int, int], Dict[str, str]] = {}
+        self._markup_rows: Dict[int, Set[int]] = {}
+
+    def clear(self) -> None:
+        if self.min_y <= self.max_y and self.min_x <= self.max_x:
+            x0 = self.min_x
+            x1 = self.max_x + 1
+            count = x1 - x0
+            blank = b" " * count if self._ascii else [" "] * count
+            widths = b"\x01" * count
+            for y in range(self.min_y, self.max_y + 1):
+                row = y * self.width
+                self.grid[row + x0 : row + x1] = blank
+                self.cell_widths[row + x0 : row + x1] = widths
+        self.min_x = self.width
+        self.max_x = 0
+        self.min_y = self.height
+        self.max_y = 0
+        self.markup.clear()
+        self._markup_rows.clear()
+
+    def _promote(self) -> None:
+        self.grid = list(self.grid.decode("ascii"))
+        self._ascii = False
+
+    def _text(self, start: int, end: int) -> str:
+        if self._ascii:
+            return self.grid[start:end].decode("ascii")
+        return "".join(self.grid[start:end])
 
     def _clear_markup(self, x: int, y: int) -> None:
-        self.markup.pop((x, y), None)
+        if self.markup.pop((x, y), None) is not None:
+            self._markup_rows[y].discard(x)
 
     def _clear_glyph_at(self, x: int, y: int) -> None:
-        width = self.cell_widths[y][x]
+        row = y * self.width
+        width = self.cell_widths[row + x]
+        if width == 1:
+            return
         base_x = x
         if width == 0:
             base_x = x - 1
-            while base_x >= 0 and self.cell_widths[y][base_x] == 0:
+            while base_x >= 0 and self.cell_widths[row + base_x] == 0:
                 base_x -= 1
             if base_x < 0:
                 return
-            width = self.cell_widths[y][base_x]
+            width = self.cell_widths[row + base_x]
             x = base_x
         if width <= 1:
             if 0 <= x < self.width:
@@ -37,49 +79,95 @@ class Canvas:
         for i in range(width):
             xi = x + i
             if 0 <= xi < self.width:
-                self.grid[y][xi] = " "
-                self.cell_widths[y][xi] = 1
+                self.grid[row + xi] = " "
+                self.cell_widths[row + xi] = 1
                 self._clear_markup(xi, y)
 
     def set(self, x: int, y: int, char: str, width: int = 1) -> None:
         if not (0 <= y < self.height and 0 <= x < self.width):
-            raise LayoutOverflowError(
-                "Diagram content exceeds canvas bounds at "
-                f"({x}, {y}). Increase canvas size via Diagram(..., "
-                "canvas_width=..., canvas_height=...)."
-            )
+            raise _overflow_error(x, y)
         if width < 1:
             width = 1
 
-        self._clear_glyph_at(x, y)
-        self._clear_markup(x, y)
+        row = y * self.width
+        index = row + x
+        if self.cell_widths[index] != 1:
+            self._clear_glyph_at(x, y)
+        if (x, y) in self.markup:
+            self._clear_markup(x, y)
 
-        self.grid[y][x] = char
-        self.cell_widths[y][x] = width
-        for i in range(1, width):
-            xi = x + i
-            if not (0 <= xi < self.width):
-                raise LayoutOverflowError(
-                    "Diagram content exceeds canvas bounds at "
-                    f"({xi}, {y}). Increase canvas size via Diagram(..., "
-                    "canvas_width=..., canvas_height=...)."
-                )
-            self.grid[y][xi] = " "
-            self.cell_widths[y][xi] = 0
-            self._clear_markup(xi, y)
+        if self._ascii:
+            if width == 1 and len(char) == 1 and char.isascii():
+                self.grid[index] = ord(char)
+            else:
+                self._promote()
+                self.grid[index] = char
+        else:
+            self.grid[index] = char
+        self.cell_widths[index] = width
+        if width > 1:
+            for i in range(1, width):
+                xi = x + i
+                if not (0 <= xi < self.width):
+                    raise _overflow_error(xi, y)
+                self.grid[row + xi] = ""
+                self.cell_widths[row + xi] = 0
+                self._clear_markup(xi, y)
 
-        for i in range(width):
-            xi = x + i
-            self.min_x = min(self.min_x, xi)
-            self.max_x = max(self.max_x, xi)
-        self.min_y = min(self.min_y, y)
-        self.max_y = max(self.max_y, y)
+        end_x = x + width - 1
+        if x < self.min_x:
+            self.min_x = x
+        if end_x > self.max_x:
+            self.max_x = end_x
+        if y < self.min_y:
+            self.min_y = y
+        if y > self.max_y:
+            self.max_y = y
+
+    def fill_row(self, y: int, x0: int, x1: int, char: str) -> None:
+        if x1 <= x0:
+            return
+        if not (0 <= y < self.height and 0 <= x0 < self.width):
+            raise _overflow_error(x0, y)
+        if x1 > self.width:
+            raise _overflow_error(self.width, y)
+
+        self._clear_glyph_at(x0, y)
+        self._clear_glyph_at(x1 - 1, y)
+        columns = self._markup_rows.get(y)
+        if columns:
+            for x in [column for column in columns if x0 <= column < x1]:
+                self._clear_markup(x, y)
+
+        row = y * self.width
+        count = x1 - x0
+        if self._ascii:
+            if len(char) == 1 and char.isascii():
+                self.grid[row + x0 : row + x1] = char.encode("ascii") * count
+            else:
+                self._promote()
+                self.grid[row + x0 : row + x1] = [char] * count
+        else:
+            self.grid[row + x0 : row + x1] = [char] * count
+        self.cell_widths[row + x0 : row + x1] = b"\x01" * count
+
+        if x0 < self.min_x:
+            self.min_x = x0
+        if x1 - 1 > self.max_x:
+            self.max_x = x1 - 1
+        if y < self.min_y:
+            self.min_y = y
+        if y > self.max_y:
+            self.max_y = y
 
     def get(self, x: int, y: int) -> str:
         if 0 <= y < self.height and 0 <= x < self.width:
-            if self.cell_widths[y][x] == 0:
+            index = y * self.width + x
+            if self._ascii:
+                return chr(self.grid[index])
+            if self.cell_widths[index] == 0:
                 return " "
-            return self.grid[y][x]
+            return self.grid[index]
         return " "
 
     def insert_markup(self, x: int, y: int, markup: str, *, position: str = "prefix") -> None:
@@ -87,38 +175,69 @@ class Canvas:
             return
         if position not in {"prefix", "suffix"}:
             position = "prefix"
-        cell = self.markup.setdefault((x, y), {"prefix": [], "suffix": []})
-        cell[position].append(markup)
+        cell = self.markup.get((x, y))
+        if cell is None:
+            cell = self.markup[(x, y)] = {"prefix": "", "suffix": ""}
+            self._markup_rows.setdefault(y, set()).add(x)
+        cell[position] += markup
+
+    def insert_markup_batch(self, cells: Iterable[Tuple[int, int, str, str]]) -> None:
+        markup = self.markup
+        markup_rows = self._markup_rows
+        for x, y, prefix, suffix in cells:
+            if not prefix and not suffix:
+                continue
+            cell = markup.get((x, y))
+            if cell is None:
+                cell = markup[(x, y)] = {"prefix": "", "suffix": ""}
+                markup_rows.setdefault(y, set()).add(x)
+            if prefix:
+                cell["prefix"] += prefix
+            if suffix:
+                cell["suffix"] += suffix
+
+    def _render_row(
+        self,
+        y: int,
+        x0: int,
+        x1: int,
+        markup_columns: Optional[Set[int]] = None,
+    ) -> str:
+        start = y * self.width
+        if not markup_columns:
+            return self._text(start + x0, start + x1)
+        parts: List[str] = []
+        cursor = x0
+        for x in sorted(markup_columns):
+            if x < x0 or x >= x1:
+                continue
+            parts.append(self._text(start + cursor, start + x))
+            cursor = x + 1
+            if self.cell_widths[start + x] == 0:
+                continue
+            markup_cell = self.markup[(x, y)]
+            parts.append(markup_cell["prefix"])
+            parts.append(self._text(start + x, start + x + 1))
+            parts.append(markup_cell["suffix"])
+        parts.append(self._text(start + cursor, start + x1))
+        return "".join(parts)
 
     def render(self, crop: bool = True, include_markup: bool = False) -> str:
+        markup_columns = self._markup_rows if include_markup else {}
+        render_row = self._render_row
         if crop and self.max_x > 0:
-            lines: List[str] = []
-            for y in range(self.min_y, self.max_y + 1):
-                parts: List[str] = []
-                for x in range(self.min_x, self.max_x + 1):
-                    if self.cell_widths[y][x] == 0:
-                        continue
-                    markup_cell = self.markup.get((x, y)) if include_markup else None
-                    if markup_cell:
-                        parts.extend(markup_cell.get("prefix", []))
-                    parts.append(self.grid[y][x])
-                    if markup_cell:
-                        parts.extend(markup_cell.get("suffix", []))
-                line = "".join(parts).rstrip()
-                lines.append(line)
-            return "\n".join(lines)
-
-        lines: List[str] = []
-        for y in range(self.height):
-            parts: List[str] = []
-            for x in range(self.width):
-                if self.cell_widths[y][x] == 0:
-                    continue
-                markup_cell = self.markup.get((x, y)) if include_markup else None
-                if markup_cell:
-                    parts.extend(markup_cell.get("prefix", []))
-                parts.append(self.grid[y][x])
-                if markup_cell:
-                    parts.extend(markup_cell.get("suffix", []))
-            lines.append("".join(parts))
-        return "\n".join(lines)
+            x0 = self.min_x
+            x1 = self.max_x + 1
+            return "\n".join(
+                [
+                    render_row(y, x0, x1, markup_columns.get(y)).rstrip()
+                    for y in range(self.min_y, self.max_y + 1)
+                ]
+            )
+
+        return "\n".join(
+            [
+                render_row(y, 0, self.width, markup_columns.get(y))
+                for y in range(self.height)
+            ]
+        )
@@ -1,5 +1,13 @@
-from dataclasses import dataclass
+from dataclasses import astuple, dataclass, replace
 from enum import Enum
+from functools import lru_cache
+from typing import Dict, Tuple
+
+
+DIR_UP = 1
+DIR_DOWN = 2
+DIR_LEFT = 4
+DIR_RIGHT = 8
 
 
 class Position(Enum):
@@ -38,9 +46,90 @@ class BoxChars:
     arrow_left: str = "◄"
     arrow_up: str = "▲"
 
+    def connector_maps(
+        self,
+    ) -> Tuple[Dict[str, int], Dict[int, str]]:
+        return type(self)._connector_maps_for(astuple(self))
+
+    @classmethod
+    @lru_cache(maxsize=16)
+    def _connector_maps_for(
+        cls, glyph_values: Tuple[str, ...]
+    ) -> Tuple[Dict[str, int], Dict[int, str]]:
+        glyphs = cls(*glyph_values)
+        char_to_dirs = {
+            " ": 0,
+            glyphs.vertical: DIR_UP | DIR_DOWN,
+            glyphs.horizontal: DIR_LEFT | DIR_RIGHT,
+            glyphs.top_left: DIR_DOWN | DIR_RIGHT,
+            glyphs.top_right: DIR_DOWN | DIR_LEFT,
+            glyphs.bottom_left: DIR_UP | DIR_RIGHT,
+            glyphs.bottom_right: DIR_UP | DIR_LEFT,
+            glyphs.cross: DIR_UP | DIR_DOWN | DIR_LEFT | DIR_RIGHT,
+            glyphs.tee_up: DIR_UP | DIR_LEFT | DIR_RIGHT,
+            glyphs.tee_down: DIR_DOWN | DIR_LEFT | DIR_RIGHT,
+            glyphs.tee_left: DIR_UP | DIR_DOWN | DIR_LEFT,
+            glyphs.tee_right: DIR_UP | DIR_DOWN | DIR_RIGHT,
+            "┌": DIR_DOWN | DIR_RIGHT,
+            "┐": DIR_DOWN | DIR_LEFT,
+            "└": DIR_UP | DIR_RIGHT,
+            "┘": DIR_UP | DIR_LEFT,
+            "┼": DIR_UP | DIR_DOWN | DIR_LEFT | DIR_RIGHT,
+            "┴": DIR_UP | DIR_LEFT | DIR_RIGHT,
+            "┬": DIR_DOWN | DIR_LEFT | DIR_RIGHT,
+            "├": DIR_UP | DIR_DOWN | DIR_RIGHT,
+            "┤": DIR_UP | DIR_DOWN | DIR_LEFT,
+        }
+        dirs_to_char = {
+            DIR_UP | DIR_DOWN: glyphs.vertical,
+            DIR_LEFT | DIR_RIGHT: glyphs.horizontal,
+            DIR_DOWN | DIR_RIGHT: glyphs.top_left,
+            DIR_DOWN | DIR_LEFT: glyphs.top_right,
+            DIR_UP | DIR_RIGHT: glyphs.bottom_left,
+            DIR_UP | DIR_LEFT: glyphs.bottom_right,
+            DIR_UP | DIR_DOWN | DIR_LEFT | DIR_RIGHT: glyphs.cross,
+            DIR_UP | DIR_LEFT | DIR_RIGHT: glyphs.tee_up,
+            DIR_DOWN | DIR_LEFT | DIR_RIGHT: glyphs.tee_down,
+            DIR_UP | DIR_DOWN | DIR_LEFT: glyphs.tee_left,
+            DIR_UP | DIR_DOWN | DIR_RIGHT: glyphs.tee_right,
+            DIR_UP: glyphs.vertical,
+            DIR_DOWN: glyphs.vertical,
+            DIR_LEFT: glyphs.horizontal,
+            DIR_RIGHT: glyphs.horizontal,
+        }
+        return char_to_dirs, dirs_to_char
+
+    def corner_map(self) -> Dict[Tuple[int, int, int, int], str]:
+        return type(self)._corner_map_for(astuple(self))
+
+    @classmethod
+    @lru_cache(maxsize=16)
+    def _corner_map_for(
+        cls, glyph_values: Tuple[str, ...]
+    ) -> Dict[Tuple[int, int, int, int], str]:
+        glyphs = cls(*glyph_values)
+        return {
+            (0, 1, 1, 0): glyphs.bottom_left,
+            (0, 1, -1, 0): glyphs.bottom_right,
+            (0, -1, 1, 0): glyphs.top_left,
+            (0, -1, -1, 0): glyphs.top_right,
+            (1, 0, 0, 1): glyphs.top_right,
+            (1, 0, 0, -1): glyphs.bottom_right,
+            (-1, 0, 0, 1): glyphs.top_left,
+            (-1, 0, 0, -1): glyphs.bottom_left,
+        }
+
     @classmethod
     def for_style(cls, style: str) -> "BoxChars":
-        key = style.lower().strip()
+        try:
+            chars = cls._for_style_key(style.lower().strip())
+        except KeyError:
+            raise ValueError(f"Unknown box style: {style}") from None
+        return replace(chars)
+
+    @classmethod
+    @lru_cache(maxsize=16)
+    def _for_style_key(cls, key: str) -> "BoxChars":
         if key in {"rounded", "round", "modern"}:
             return cls()
         if key in {"square", "line", "box"}:
@@ -103,4 +192,4 @@ class BoxChars:
                 tee_left="┫",
                 cross="╋",
             )
-        raise ValueError(f"Unknown box style: {style}")
+        raise KeyError(key)
@@ -1,6 +1,10 @@
 import heapq
+import re
 import shutil
+from bisect import bisect_left, bisect_right
 from collections import deque, defaultdict
+from dataclasses import astuple
+from operator import attrgetter
 from typing import (
     Any,
     Callable,
@@ -17,8 +21,16 @@ from typing import (
 from wcwidth import wcwidth
 
 from ..errors import ConfigurationError, DiagramError, LayoutOverflowError
-from .canvas import Canvas
-from .core import BoxChars, Position, Shape
+from .canvas import Canvas, _overflow_error
+from .core import (
+    DIR_DOWN,
+    DIR_LEFT,
+    DIR_RIGHT,
+    DIR_UP,
+    BoxChars,
+    Position,
+    Shape,
+)
 from .grid_layout import GridLayout
 from .edge import Edge
 from .node import Node
@@ -27,6 +39,52 @@ from ..agent.fireworks_client import FireworksError, chat_completion
 
 _DEFAULT_LLM_SYSTEM_PROMPT = "You are a helpful assistant. Provide concise, factual answers to the user's request."
 
+_DIR_BITS: Dict[str, int] = {
+    "up": DIR_UP,
+    "down": DIR_DOWN,
+    "left": DIR_LEFT,
+    "right": DIR_RIGHT,
+}
+_DIR_OR_TABLES: Dict[int, bytes] = {
+    mask: bytes(value | mask for value in range(256))
+    for mask in (DIR_UP | DIR_DOWN, DIR_LEFT | DIR_RIGHT)
+}
+_STEP_DIRECTIONS: Tuple[Tuple[Optional[str], ...], ...] = (
+    ("left", "up", "right"),
+    ("left", None, "right"),
+    ("left", "down", "right"),
+)
+_EDGE_PRESENT = 1
+_EDGE_CORNER = 2
+_TRACK_PROXIMITY_PENALTY = 2
+_CORNER_PENALTY = 12
+_NO_STEP = 4
+_ROUTE_STEPS: Tuple[Tuple[int, int, int, int], ...] = (
+    (1, 0, 2, DIR_LEFT | DIR_RIGHT),
+    (-1, 0, 1, DIR_LEFT | DIR_RIGHT),
+    (0, 1, 0, DIR_UP | DIR_DOWN),
+    (0, -1, 3, DIR_UP | DIR_DOWN),
+)
+_AXIS_BITS: Dict[str, int] = {
+    "up": DIR_UP | DIR_DOWN,
+    "down": DIR_UP | DIR_DOWN,
+    "left": DIR_LEFT | DIR_RIGHT,
+    "right": DIR_LEFT | DIR_RIGHT,
+}
+_INF = float("inf")
+_node_center_x = attrgetter("center_x")
+_MARKUP_RE = re.compile(r"(\[[^\]]*\])|(\n)|([^\[\n]+|\[)")
+
+_WCWIDTH_CACHE: Dict[str, int] = {chr(code): 1 for code in range(32, 127)}
+
+
+def _char_width(char: str) -> int:
+    width = _WCWIDTH_CACHE.get(char)
+    if width is None:
+        width = max(wcwidth(char), 1)
+        _WCWIDTH_CACHE[char] = width
+    return width
+
 
 class Diagram:
     def __init__(
@@ -123,7 +181,41 @@ class Diagram:
             max(32, canvas_height) if canvas_height is not None else 1000
         )
         self._edges: List[Edge] = []
-        self._edge_state: Dict[Tuple[int, int], Dict[str, object]] = {}
+        self._version = 0
+        self._render_cache: Optional[Tuple[Tuple[object, ...], str]] = None
+        self._canvas_pool: Optional[Canvas] = None
+        self._edge_dirs = bytearray()
+        self._edge_arrows = bytearray()
+        self._edge_flags = bytearray()
+        self._edge_track = bytearray()
+        self._edge_cost = bytearray()
+        self._edge_corner_chars: Dict[int, str] = {}
+        self._edge_styles: Dict[int, str] = {}
+        self._edge_cells: List[int] = []
+        self._edge_overflow: List[Tuple[int, int]] = []
+        self._rects_cache: Dict[int, List[Tuple[int, int, int, int]]] = {}
+        self._occupancy_cache: Optional[
+            Tuple[
+                Tuple[int, int, Tuple[Tuple[int, int, int, int], ...]],
+                bytearray,
+                bytearray,
+                Dict[int, Tuple[int, int]],
+            ]
+        ] = None
+        self._connector_maps_cache: Optional[
+            Tuple[Dict[str, int], Dict[int, str]]
+        ] = None
+        self._corner_map_cache: Optional[Dict[Tuple[int, int, int, int], str]] = None
+        self._connector_glyphs_cache: Optional[Tuple[str, ...]] = None
+        self._connector_groups: Dict[
+            Tuple[Node, Position], List[Tuple[int, List[Node]]]
+        ] = {}
+        self._connector_dispatch = {
+            Position.BOTTOM: self._draw_connector_bottom,
+            Position.RIGHT: self._draw_connector_right,
+            Position.LEFT: self._draw_connector_left,
+            Position.TOP: self._draw_connector_top,
+        }
         self.connector_style = connector_style
         self._manual_layout: Optional[Tuple[str, object]] = None
         self._grid_min_nodes = 8
@@ -151,7 +243,7 @@ class Diagram:
         if effective_width:
             content_limit = max(effective_width - 4, 1)
 
-        tokens = self._tokenize_markup(node.text or "")
+        tokens = self._text_tokens(node)
         lines_tokens = self._wrap_tokens(tokens, content_limit)
         if not lines_tokens:
             lines_tokens = [[("text", " ", 1)]]
@@ -159,11 +251,16 @@ class Diagram:
         plain_lines: List[str] = []
         display_widths: List[int] = []
         for line in lines_tokens:
-            plain_chars = [value for kind, value, _ in line if kind == "text"]
+            plain_chars: List[str] = []
+            line_width = 0
+            for kind, value, width in line:
+                if kind == "text":
+                    plain_chars.append(value)
+                    line_width += width
             plain_lines.append("".join(plain_chars).rstrip())
-            display_widths.append(sum(token[2] for token in line if token[0] == "text"))
+            display_widths.append(line_width)
 
-        inner_width = max(display_widths) if display_widths else 0
+        inner_width = max(display_widths, default=0)
         node.lines = plain_lines
         node.tokens_lines = lines_tokens
         node.box_width = inner_width + 4
@@ -184,29 +281,41 @@ class Diagram:
         node.subtree_max_x = node.box_width
         node.subtree_width = node.box_width
 
-    def _prepare_nodes(self, node: Node):
-        self._prepare_node(node)
-        for child, _ in node.children:
-            self._prepare_nodes(child)
+    def _walk_subtree(self, node: Node) -> List[Node]:
+        order: List[Node] = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            order.append(current)
+            stack.extend(reversed(current.child_nodes))
+        return order
 
     def _tokenize_markup(self, text: str) -> List[Tuple[str, str, int]]:
+        if "[" not in text and "\n" not in text:
+            if text.isascii():
+                return [("text", char, 1) for char in text]
+            return [("text", char, _char_width(char)) for char in text]
         tokens: List[Tuple[str, str, int]] = []
-        i = 0
-        length = len(text)
-        while i < length:
-            char = text[i]
-            if char == "[":
-                end = text.find("]", i + 1)
-                if end != -1:
-                    tag = text[i : end + 1]
-                    tokens.append(("tag", tag, 0))
-                    i = end + 1
-                    continue
-            if char == "\n":
-                tokens.append(("newline", char, 0))
+        append = tokens.append
+        for tag, newline, run in _MARKUP_RE.findall(text):
+            if tag:
+                append(("tag", tag, 0))
+            elif newline:
+                append(("newline", newline, 0))
+            elif run.isascii():
+                tokens.extend([("text", char, 1) for char in run])
             else:
-                tokens.append(("text", char, max(wcwidth(char), 1)))
-            i += 1
+                for char in run:
+                    append(("text", char, _char_width(char)))
+        return tokens
+
+    def _text_tokens(self, node: Node) -> List[Tuple[str, str, int]]:
+        text = node.text or ""
+        cached = node._markup_tokens
+        if cached is not None and cached[0] == text:
+            return cached[1]
+        tokens = self._tokenize_markup(text)
+        node._markup_tokens = (text, tokens)
         return tokens
 
     def _wrap_tokens(
@@ -215,62 +324,51 @@ class Diagram:
         if not tokens:
             return [[]]
 
-        def closing_for(tag: str) -> str:
-            if tag.startswith("[") and not tag.startswith("[/"):
-                return f"[/{tag[1:]}"
-            return tag
-
         lines: List[List[Tuple[str, str, int]]] = []
         current: List[Tuple[str, str, int]] = []
         line_width = 0
         active_tags: List[str] = []
+        open_tokens: List[Tuple[str, str, int]] = []
+        close_tokens: List[Tuple[str, str, int]] = []
+        wrap = bool(limit and limit > 0)
 
-        def close_active(line: List[Tuple[str, str, int]]):
-            for tag in reversed(active_tags):
-                line.append(("tag", closing_for(tag), 0))
-
-        def start_new_line():
-            nonlocal current, line_width
-            if current:
-                close_active(current)
-                lines.append(current)
-            current = []
-            line_width = 0
-            for tag in active_tags:
-                current.append(("tag", tag, 0))
-
-        def ensure_limit(width: int):
-            nonlocal line_width
-            if limit and limit > 0 and line_width + width > limit and current:
-                start_new_line()
-
-        for kind, value, width in tokens:
+        for token in tokens:
+            kind, value, width = token
             if kind == "newline":
-                start_new_line()
+                if current:
+                    current.extend(reversed(close_tokens))
+                    lines.append(current)
+                current = list(open_tokens)
+                line_width = 0
                 continue
 
             if kind == "tag":
+                current.append(token)
                 if value.startswith("[/"):
-                    current.append((kind, value, width))
                     target = value[2:-1]
-                    if active_tags and active_tags[-1][1:-1] == target:
-                        active_tags.pop()
-                    else:
-                        for idx in range(len(active_tags) - 1, -1, -1):
-                            if active_tags[idx][1:-1] == target:
-                                active_tags.pop(idx)
-                                break
+                    for idx in range(len(active_tags) - 1, -1, -1):
+                        if active_tags[idx][1:-1] == target:
+                            del active_tags[idx]
+                            del open_tokens[idx]
+                            del close_tokens[idx]
+                            break
                 else:
+                    closing = f"[/{value[1:]}" if value.startswith("[") else value
                     active_tags.append(value)
-                    current.append((kind, value, width))
+                    open_tokens.append(token)
+                    close_tokens.append(("tag", closing, 0))
                 continue
 
-            ensure_limit(width)
+            if wrap and current and line_width + width > limit:
+                current.extend(reversed(close_tokens))
+                lines.append(current)
+                current = list(open_tokens)
+                line_width = 0
             current.append(("text", value, width))
             line_width += width
 
         if current:
-            close_active(current)
+            current.extend(reversed(close_tokens))
             lines.append(current)
 
         return lines or [[]]
@@ -307,113 +405,139 @@ class Diagram:
 
         return rows
 
-    def _char_to_dirs(self, char: str) -> set:
-        mapping = {
-            " ": set(),
-            self.chars.vertical: {"up", "down"},
-            self.chars.horizontal: {"left", "right"},
-            self.chars.top_left: {"down", "right"},
-            self.chars.top_right: {"down", "left"},
-            self.chars.bottom_left: {"up", "right"},
-            self.chars.bottom_right: {"up", "left"},
-            self.chars.cross: {"up", "down", "left", "right"},
-            self.chars.tee_up: {"up", "left", "right"},
-            self.chars.tee_down: {"down", "left", "right"},
-            self.chars.tee_left: {"up", "down", "left"},
-            self.chars.tee_right: {"up", "down", "right"},
-            "┌": {"down", "right"},
-            "┐": {"down", "left"},
-            "└": {"up", "right"},
-            "┘": {"up", "left"},
-            "┼": {"up", "down", "left", "right"},
-            "┴": {"up", "left", "right"},
-            "┬": {"down", "left", "right"},
-            "├": {"up", "down", "right"},
-            "┤": {"up", "down", "left"},
-        }
-        return set(mapping.get(char, set()))
+    def _connector_maps(
+        self,
+    ) -> Tuple[Dict[str, int], Dict[int, str]]:
+        cached = self._connector_maps_cache
+        if cached is None:
+            cached = self._connector_maps_cache = self.chars.connector_maps()
+        return cached
+
+    def _corner_map(self) -> Dict[Tuple[int, int, int, int], str]:
+        cached = self._corner_map_cache
+        if cached is None:
+            cached = self._corner_map_cache = self.chars.corner_map()
+        return cached
+
+    def _connector_glyphs(self) -> Tuple[str, ...]:
+        cached = self._connector_glyphs_cache
+        if cached is None:
+            dirs_to_char = self._connector_maps()[1]
+            cross = self.chars.cross
+            cached = self._connector_glyphs_cache = (" ",) + tuple(
+                dirs_to_char.get(mask, cross) for mask in range(1, 16)
+            )
+        return cached
 
-    def _dirs_to_char(self, dirs: set) -> str:
-        if not dirs:
-            return " "
-        key = frozenset(dirs)
-        mapping = {
-            frozenset({"up", "down"}): self.chars.vertical,
-            frozenset({"left", "right"}): self.chars.horizontal,
-            frozenset({"down", "right"}): self.chars.top_left,
-            frozenset({"down", "left"}): self.chars.top_right,
-            frozenset({"up", "right"}): self.chars.bottom_left,
-            frozenset({"up", "left"}): self.chars.bottom_right,
-            frozenset({"up", "down", "left", "right"}): self.chars.cross,
-            frozenset({"up", "left", "right"}): self.chars.tee_up,
-            frozenset({"down", "left", "right"}): self.chars.tee_down,
-            frozenset({"up", "down", "left"}): self.chars.tee_left,
-            frozenset({"up", "down", "right"}): self.chars.tee_right,
-            frozenset({"up"}): self.chars.vertical,
-            frozenset({"down"}): self.chars.vertical,
-            frozenset({"left"}): self.chars.horizontal,
-            frozenset({"right"}): self.chars.horizontal,
-        }
-        return mapping.get(key, self.chars.cross)
+    def _char_to_dirs(self, char: str) -> int:
+        return self._connector_maps()[0].get(char, 0)
+
+    def _dirs_to_char(self, dirs: int) -> str:
+        return self._connector_glyphs()[dirs]
 
     def _write_dirs(
-        self, canvas: Canvas, x: int, y: int, dirs: set, style: Optional[str] = None
+        self,
+        canvas: Canvas,
+        x: int,
+        y: int,
+        dirs: int,
+        style: Optional[str] = None,
     ):
         if style is None:
             style = self.connector_style
-        existing_dirs = self._char_to_dirs(canvas.get(x, y))
-        combined = existing_dirs.union(dirs)
-        self._set_connector_char(canvas, x, y, self._dirs_to_char(combined), style)
+        combined = self._connector_maps()[0].get(canvas.get(x, y), 0) | dirs
+        self._set_connector_char(
+            canvas, x, y, self._connector_glyphs()[combined], style
+        )
 
-    def _measure_subtree(self, node: Node):
+    def _split_children(
+        self, node: Node
+    ) -> Tuple[List[Node], List[Node], List[Node], List[Node]]:
+        right: List[Node] = []
+        left: List[Node] = []
+        bottom: List[Node] = []
+        top: List[Node] = []
+        for child, pos in node.children:
+            if pos is Position.RIGHT:
+                right.append(child)
+            elif pos is Position.LEFT:
+                left.append(child)
+            elif pos is Position.BOTTOM:
+                bottom.append(child)
+            elif pos is Position.TOP:
+                top.append(child)
+        return right, left, bottom, top
+
+    def _refresh_geometry(self) -> None:
+        key = (
+            self._effective_max_box_width or self.max_box_width,
+            self.h_spacing,
+            self.v_spacing,
+            self._current_layout_width,
+        )
+        stale: List[Node] = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node._subtree_cache_valid and node._subtree_cache_key == key:
+                continue
+            stale.append(node)
+            stack.extend(node.child_nodes)
+        for node in stale:
+            self._prepare_node(node)
+        for node in reversed(stale):
+            self._measure_node(node)
+            node._subtree_cache_valid = True
+            node._subtree_cache_key = key
+
+    def _measure_node(self, node: Node):
+        node.bottom_row_groups = []
+        node.top_row_groups = []
+        node.subtree_count = 1 + sum(child.subtree_count for child in node.child_nodes)
         if not node.children:
             node.subtree_min_x = 0
             node.subtree_max_x = node.box_width
             node.subtree_width = node.box_width
             return
 
-        child_extents = []
-        for child, position in node.children:
-            self._measure_subtree(child)
-            child_extents.append((child, position))
+        h_spacing = self.h_spacing
+        v_spacing = self.v_spacing
+        box_width = node.box_width
+        node_height = node.height
 
         min_x = 0
-        max_x = node.box_width
-        node.subtree_height = node.height
+        max_x = box_width
+        node.subtree_height = node_height
 
-        right_children = [
-            child for child, pos in child_extents if pos == Position.RIGHT
-        ]
-        left_children = [child for child, pos in child_extents if pos == Position.LEFT]
-        bottom_children = [
-            child for child, pos in child_extents if pos == Position.BOTTOM
-        ]
-        top_children = [child for child, pos in child_extents if pos == Position.TOP]
+        right_children, left_children, bottom_children, top_children = (
+            self._split_children(node)
+        )
 
         for child in left_children:
             child_min = child.subtree_min_x
             child_max = child.subtree_max_x
-            child_x = -self.h_spacing - child_max
+            child_x = -h_spacing - child_max
             min_x = min(min_x, child_x + child_min)
             max_x = max(max_x, child_x + child_max)
 
         for child in right_children:
             child_min = child.subtree_min_x
             child_max = child.subtree_max_x
-            child_x = node.box_width + self.h_spacing - child_min
+            child_x = box_width + h_spacing - child_min
             min_x = min(min_x, child_x + child_min)
             max_x = max(max_x, child_x + child_max)
 
         if bottom_children:
             row_groups = self._group_bottom_children(bottom_children)
-            current_y = node.height + self.v_spacing
-            max_extent = node.height
+            node.bottom_row_groups = row_groups
+            current_y = node_height + v_spacing
+            max_extent = node_height
 
             for row in row_groups:
                 row_width = sum(
                     child.subtree_width for child in row
-                ) + self.h_spacing * (len(row) - 1)
-                start_x = node.box_width // 2 - row_width // 2
+                ) + h_spacing * (len(row) - 1)
+                start_x = box_width // 2 - row_width // 2
                 current_x = start_x
                 for child in row:
                     child_min = child.subtree_min_x
@@ -421,21 +545,22 @@ class Diagram:
                     child_x = current_x - child_min
                     min_x = min(min_x, child_x + child_min)
                     max_x = max(max_x, child_x + child_max)
-                    current_x += child.subtree_width + self.h_spacing
+                    current_x += child.subtree_width + h_spacing
 
                 row_height = max(child.subtree_height for child in row)
                 max_extent = max(max_extent, current_y + row_height)
-                current_y += row_height + self.v_spacing
+                current_y += row_height + v_spacing
 
             node.subtree_height = max(node.subtree_height, max_extent)
 
         if top_children:
             row_groups = self._group_bottom_children(top_children)
+            node.top_row_groups = row_groups
             for row in row_groups:
                 row_width = sum(
                     child.subtree_width for child in row
-                ) + self.h_spacing * (len(row) - 1)
-                start_x = node.box_width // 2 - row_width // 2
+                ) + h_spacing * (len(row) - 1)
+                start_x = box_width // 2 - row_width // 2
                 current_x = start_x
                 for child in row:
                     child_min = child.subtree_min_x
@@ -443,22 +568,22 @@ class Diagram:
                     child_x = current_x - child_min
                     min_x = min(min_x, child_x + child_min)
                     max_x = max(max_x, child_x + child_max)
-                    current_x += child.subtree_width + self.h_spacing
+                    current_x += child.subtree_width + h_spacing
 
         if right_children:
             offset = 0
-            max_span = node.height
+            max_span = node_height
             for child in right_children:
                 max_span = max(max_span, offset + child.subtree_height)
-                offset += child.subtree_height + self.v_spacing
+                offset += child.subtree_height + v_spacing
             node.subtree_height = max(node.subtree_height, max_span)
 
         if left_children:
             offset = 0
-            max_span = node.height
+            max_span = node_height
             for child in left_children:
                 max_span = max(max_span, offset + child.subtree_height)
-                offset += child.subtree_height + self.v_spacing
+                offset += child.subtree_height + v_spacing
             node.subtree_height = max(node.subtree_height, max_span)
 
         node.subtree_min_x = min_x
@@ -562,37 +687,43 @@ class Diagram:
             style=style,
         )
         self._edges.append(edge)
+        self._version += 1
         return edge
 
     def clear_edges(self) -> None:
         self._edges.clear()
+        self._version += 1
 
     def validate(self) -> List[str]:
         issues: List[str] = []
         seen: Set[int] = set()
 
-        def walk(node: Node, path: Tuple[str, ...]):
+        stack: List[Tuple[Node, Tuple[str, ...], Optional[Node], int]] = [
+            (self.root, (self.root.text or "<root>",), None, 0)
+        ]
+        while stack:
+            node, path, parent, index = stack.pop()
+            if parent is not None:
+                if node.parent is not parent:
+                    issues.append(
+                        f"Parent mismatch: child at index {index} expects {node.parent!r} but is linked from {parent!r}."
+                    )
+                if node.diagram is not self:
+                    issues.append(
+                        f"Foreign node detected: child at index {index} does not belong to this diagram."
+                    )
             node_id = id(node)
             if node_id in seen:
                 issues.append(
                     "Cycle detected: node %s is referenced multiple times."
                     % (" -> ".join(path),)
                 )
-                return
+                continue
             seen.add(node_id)
-
-            for index, (child, _) in enumerate(node.children):
-                if child.parent is not node:
-                    issues.append(
-                        f"Parent mismatch: child at index {index} expects {child.parent!r} but is linked from {node!r}."
-                    )
-                if child.diagram is not self:
-                    issues.append(
-                        f"Foreign node detected: child at index {index} does not belong to this diagram."
-                    )
-                walk(child, path + (child.text or f"<child-{index}>",))
-
-        walk(self.root, (self.root.text or "<root>",))
+            for child_index in range(len(node.children) - 1, -1, -1):
+                child = node.children[child_index][0]
+                label = child.text or f"<child-{child_index}>"
+                stack.append((child, path + (label,), node, child_index))
         return issues
 
     def subdiagram(self, node: Node, depth: Optional[int] = None) -> "Diagram":
@@ -617,17 +748,19 @@ class Diagram:
 
         node_map: Dict[Node, Node] = {node: new_diagram.root}
 
-        def clone(src: Node, dst: Node, level: int):
+        stack: List[Tuple[Node, Node, int]] = [(node, new_diagram.root, 0)]
+        while stack:
+            src, dst, level = stack.pop()
             if depth is not None and level >= depth:
-                return
+                continue
+            pending: List[Tuple[Node, Node, int]] = []
             for child, position in src.children:
                 new_child = dst.add(
                     child.text, position, title=getattr(child, "title", None)
                 )
                 node_map[child] = new_child
-                clone(child, new_child, level + 1)
-
-        clone(node, new_diagram.root, 0)
+                pending.append((child, new_child, level + 1))
+            stack.extend(reversed(pending))
 
         for edge in self._edges:
             src_new = node_map.get(edge.source)
@@ -657,39 +790,26 @@ class Diagram:
         self._effective_max_box_width = self.max_box_width
 
         layout_limit = self._current_layout_width
-        attempts = 0
-        while True:
-            self._prepare_nodes(self.root)
-            self._measure_subtree(self.root)
-
-            if self._manual_layout:
-                layout_type, payload = self._manual_layout
-                if layout_type == "grid":
-                    grid_rows = payload
-                    GridLayout(
-                        self,
-                        grid_rows,
-                        horizontal_spacing=self.h_spacing,
-                        vertical_spacing=self.v_spacing,
-                    ).apply()
-                    return
+        self._refresh_geometry()
+
+        if self._manual_layout:
+            layout_type, payload = self._manual_layout
+            if layout_type == "grid":
+                grid_rows = payload
+                GridLayout(
+                    self,
+                    grid_rows,
+                    horizontal_spacing=self.h_spacing,
+                    vertical_spacing=self.v_spacing,
+                ).apply()
+                return
 
-            if (
-                not layout_limit
-                or self.root.subtree_width <= layout_limit
-                or not self._effective_max_box_width
-            ):
-                break
-            if self._effective_max_box_width <= 14:
-                break
-            self._effective_max_box_width = max(14, self._effective_max_box_width - 4)
-            attempts += 1
-            if attempts > 10:
-                break
+        if not self._layout_fits(layout_limit):
+            self._shrink_to_fit(layout_limit)
 
         self.root.x = 0
         self.root.y = 0
-        total_nodes = self._count_nodes(self.root)
+        total_nodes = self.root.subtree_count
         use_grid_layout = self._manual_layout is None and self._should_use_grid_layout(
             self.root, total_nodes, True
         )
@@ -700,11 +820,44 @@ class Diagram:
         if not self.allow_intersections and not use_grid_layout:
             self._auto_avoid()
 
-    def _count_nodes(self, node: Node) -> int:
-        total = 1
-        for child, _ in node.children:
-            total += self._count_nodes(child)
-        return total
+    def _layout_fits(self, layout_limit: Optional[int]) -> bool:
+        return (
+            not layout_limit
+            or self.root.subtree_width <= layout_limit
+            or not self._effective_max_box_width
+        )
+
+    def _shrink_to_fit(self, layout_limit: int):
+        widths: List[int] = []
+        width = self._effective_max_box_width
+        while width > 14 and len(widths) < 11:
+            width = max(14, width - 4)
+            widths.append(width)
+        measured = min(len(widths), 10)
+
+        current = self._effective_max_box_width
+        capped = sum(
+            1 for node in self._walk_subtree(self.root) if node.box_width >= current
+        )
+        excess = self.root.subtree_width - layout_limit
+        # Each step trims 4 columns from every capped box, so estimate the steps.
+        guess = min(-(-excess // (4 * max(capped, 1))), measured) - 1
+        if guess >= 1:
+            self._effective_max_box_width = widths[guess - 1]
+            self._refresh_geometry()
+            if not self._layout_fits(layout_limit):
+                self._effective_max_box_width = widths[guess]
+                self._refresh_geometry()
+                if self._layout_fits(layout_limit):
+                    return
+
+        for width in widths[:measured]:
+            self._effective_max_box_width = width
+            self._refresh_geometry()
+            if self._layout_fits(layout_limit):
+                return
+        if len(widths) > measured:
+            self._effective_max_box_width = widths[measured]
 
     def _should_use_grid_layout(
         self, node: Node, total_nodes: int, is_root: bool
@@ -713,11 +866,12 @@ class Diagram:
             return True
         if is_root and total_nodes <= self._grid_min_nodes:
             return False
-        for child, position in node.children:
-            if position is not Position.BOTTOM:
-                return False
-            if not self._should_use_grid_layout(child, total_nodes, False):
-                return False
+        stack = [node]
+        while stack:
+            for child, position in stack.pop().children:
+                if position is not Position.BOTTOM:
+                    return False
+                stack.append(child)
         return True
 
     def use_grid_layout(self, rows: List[List[Node]]) -> None:
@@ -726,6 +880,15 @@ class Diagram:
         row_length = len(rows[0])
         if row_length == 0:
             raise ConfigurationError("Grid layout rows must not be empty.")
+        flat = [node for row in rows for node in row]
+        if (
+            all(len(row) == row_length for row in rows)
+            and all(isinstance(node, Node) and node.diagram is self for node in flat)
+            and len(set(flat)) == len(flat)
+        ):
+            self._manual_layout = ("grid", [list(row) for row in rows])
+            self._version += 1
+            return
         seen: Set[Node] = set()
         normalized: List[List[Node]] = []
         for row in rows:
@@ -747,19 +910,22 @@ class Diagram:
                 normalized_row.append(node)
             normalized.append(normalized_row)
         self._manual_layout = ("grid", normalized)
+        self._version += 1
 
     def _layout_grid(self, root: Node) -> None:
-        levels: Dict[int, List[Node]] = defaultdict(list)
+        levels: List[List[Node]] = []
         queue: deque[Tuple[Node, int]] = deque([(root, 0)])
         all_nodes: List[Node] = []
         max_width = 0
 
         while queue:
             node, depth = queue.popleft()
+            if depth == len(levels):
+                levels.append([])
             levels[depth].append(node)
             all_nodes.append(node)
             max_width = max(max_width, node.box_width)
-            for child, _ in node.children:
+            for child in node.child_nodes:
                 queue.append((child, depth + 1))
 
         if not all_nodes:
@@ -767,19 +933,11 @@ class Diagram:
 
         horizontal_gap = max(4, self.h_spacing * 2)
         cell_width = max_width + horizontal_gap
-        level_heights: Dict[int, int] = {
-            depth: max(child.height for child in nodes)
-            for depth, nodes in levels.items()
-        }
-
         current_y = 0
         min_x: Optional[int] = None
 
-        for depth in sorted(levels.keys()):
-            nodes_in_level = levels[depth]
-            if not nodes_in_level:
-                continue
-            row_height = level_heights[depth]
+        for nodes_in_level in levels:
+            row_height = max(child.height for child in nodes_in_level)
             count = len(nodes_in_level)
             if count == 1:
                 centers = [0.0]
@@ -806,36 +964,45 @@ class Diagram:
                 node.x += shift
 
     def _layout_node(self, node: Node):
-        if not node.children:
-            return
+        stack = [node]
+        while stack:
+            stack.extend(self._place_children(stack.pop()))
 
-        bottom_children = [
-            child for child, pos in node.children if pos == Position.BOTTOM
-        ]
-        right_children = [
-            child for child, pos in node.children if pos == Position.RIGHT
-        ]
-        left_children = [child for child, pos in node.children if pos == Position.LEFT]
-        top_children = [child for child, pos in node.children if pos == Position.TOP]
+    def _place_children(self, node: Node) -> List[Node]:
+        placed: List[Node] = []
+        if not node.children:
+            return placed
+
+        h_spacing = self.h_spacing
+        v_spacing = self.v_spacing
+        box_width = node.box_width
+        node_height = node.height
+        node_x = node.x
+        node_y = node.y
+        place = placed.append
+
+        right_children, left_children, bottom_children, top_children = (
+            self._split_children(node)
+        )
 
         if right_children:
-            current_y = node.y
+            current_y = node_y
             for child in right_children:
-                child.x = node.x + node.box_width + self.h_spacing - child.subtree_min_x
+                child.x = node_x + box_width + h_spacing - child.subtree_min_x
                 child.y = current_y
-                self._layout_node(child)
-                current_y += child.subtree_height + self.v_spacing
+                place(child)
+                current_y += child.subtree_height + v_spacing
 
         if left_children:
-            current_y = node.y
+            current_y = node_y
             for child in left_children:
-                child.x = node.x - self.h_spacing - child.subtree_max_x
+                child.x = node_x - h_spacing - child.subtree_max_x
                 child.y = current_y
-                self._layout_node(child)
-                current_y += child.subtree_height + self.v_spacing
+                place(child)
+                current_y += child.subtree_height + v_spacing
 
         if top_children:
-            row_groups = self._group_bottom_children(top_children)
+            row_groups = node.top_row_groups
 
             row_layouts = []
             all_left_edges: List[int] = []
@@ -844,8 +1011,8 @@ class Diagram:
             for row in row_groups:
                 row_width = sum(
                     child.subtree_width for child in row
-                ) + self.h_spacing * (len(row) - 1)
-                start_x = node.x + (node.box_width // 2) - (row_width // 2)
+                ) + h_spacing * (len(row) - 1)
+                start_x = node_x + (box_width // 2) - (row_width // 2)
                 current_x = start_x
                 entries = []
                 for child in row:
@@ -855,17 +1022,17 @@ class Diagram:
                     entries.append((child, child_x, left_edge, right_edge))
                     all_left_edges.append(left_edge)
                     all_right_edges.append(right_edge)
-                    current_x += child.subtree_width + self.h_spacing
+                    current_x += child.subtree_width + h_spacing
 
                 row_height = max(child.subtree_height for child in row)
                 row_layouts.append((entries, row_height))
 
-            branch_left = min(all_left_edges) if all_left_edges else node.x
+            branch_left = min(all_left_edges) if all_left_edges else node_x
             branch_right = (
-                max(all_right_edges) if all_right_edges else node.x + node.box_width
+                max(all_right_edges) if all_right_edges else node_x + box_width
             )
 
-            base_y = node.y - self.v_spacing - 1
+            base_y = node_y - v_spacing - 1
             overlapping_side_children = [
                 child
                 for child in right_children + left_children
@@ -874,25 +1041,25 @@ class Diagram:
             ]
             if overlapping_side_children:
                 side_min_top = min(child.y for child in overlapping_side_children)
-                base_y = min(base_y, side_min_top - self.v_spacing)
+                base_y = min(base_y, side_min_top - v_spacing)
 
-            current_branch_y = min(base_y, node.y - 2)
+            current_branch_y = min(base_y, node_y - 2)
 
             for row_index, (entries, row_height) in enumerate(row_layouts):
-                branch_y = min(current_branch_y, node.y - 2)
+                branch_y = min(current_branch_y, node_y - 2)
                 for child, child_x, _, _ in entries:
                     child.branch_row_index = row_index
                     child.branch_anchor_y = branch_y
                     child.branch_from = Position.TOP
                     child.x = child_x
                     child.y = branch_y - child.subtree_height
-                    self._layout_node(child)
+                    place(child)
 
                 min_child_top = min(child.y for child, _, _, _ in entries)
-                current_branch_y = min_child_top - self.v_spacing - 1
+                current_branch_y = min_child_top - v_spacing - 1
 
         if bottom_children:
-            row_groups = self._group_bottom_children(bottom_children)
+            row_groups = node.bottom_row_groups
 
             row_layouts = []
             all_left_edges: List[int] = []
@@ -901,8 +1068,8 @@ class Diagram:
             for row in row_groups:
                 row_width = sum(
                     child.subtree_width for child in row
-                ) + self.h_spacing * (len(row) - 1)
-                start_x = node.x + (node.box_width // 2) - (row_width // 2)
+                ) + h_spacing * (len(row) - 1)
+                start_x = node_x + (box_width // 2) - (row_width // 2)
                 current_x = start_x
                 entries = []
                 for child in row:
@@ -912,7 +1079,7 @@ class Diagram:
                     entries.append((child, child_x, left_edge, right_edge))
                     all_left_edges.append(left_edge)
                     all_right_edges.append(right_edge)
-                    current_x += child.subtree_width + self.h_spacing
+                    current_x += child.subtree_width + h_spacing
 
                 row_height = max(child.subtree_height for child in row)
                 row_layouts.append((entries, row_height))
@@ -920,7 +1087,7 @@ class Diagram:
             branch_left = min(all_left_edges)
             branch_right = max(all_right_edges)
 
-            base_y = node.y + node.height + self.v_spacing
+            base_y = node_y + node_height + v_spacing
             overlapping_side_children = [
                 child
                 for child in right_children + left_children
@@ -932,12 +1099,12 @@ class Diagram:
                     child.y + child.subtree_height
                     for child in overlapping_side_children
                 )
-                base_y = max(base_y, side_max_bottom + self.v_spacing)
+                base_y = max(base_y, side_max_bottom + v_spacing)
 
             current_y = base_y
             for row_index, (entries, row_height) in enumerate(row_layouts):
                 branch_y = current_y - 3
-                min_branch = node.y + node.height
+                min_branch = node_y + node_height
                 if branch_y < min_branch:
                     branch_y = min_branch
                 if branch_y > current_y - 2:
@@ -948,17 +1115,34 @@ class Diagram:
                     child.branch_from = Position.BOTTOM
                     child.x = child_x
                     child.y = current_y
-                    self._layout_node(child)
-                current_y += row_height + self.v_spacing
+                    place(child)
+                current_y += row_height + v_spacing
+
+        return placed
 
     def _shift_subtree(self, node: Node, dy: int):
         if dy == 0:
             return
+        rects_cache = self._rects_cache
+        ancestor = node.parent
+        while ancestor is not None:
+            rects_cache.pop(id(ancestor), None)
+            ancestor = ancestor.parent
         node.y += dy
         if node.branch_anchor_y is not None:
             node.branch_anchor_y += dy
-        for child, _ in node.children:
-            self._shift_subtree(child, dy)
+        node.pending_y_offset += dy
+
+    def _apply_pending_offset(self, node: Node):
+        dy = node.pending_y_offset
+        if not dy:
+            return
+        node.pending_y_offset = 0
+        for child in node.child_nodes:
+            child.y += dy
+            if child.branch_anchor_y is not None:
+                child.branch_anchor_y += dy
+            child.pending_y_offset += dy
 
     def _occupy_rect(
         self,
@@ -971,26 +1155,32 @@ class Diagram:
         if x0 > x1 or y0 > y1:
             return
         for y in range(y0, y1 + 1):
-            intervals = occupied.setdefault(y, [])
-            intervals.append((x0, x1))
-            intervals.sort()
-            merged: List[Tuple[int, int]] = []
-            for start, end in intervals:
-                if not merged or start > merged[-1][1] + 1:
-                    merged.append([start, end])
-                else:
-                    merged[-1][1] = max(merged[-1][1], end)
-            occupied[y] = [(start, end) for start, end in merged]
+            intervals = occupied[y]
+            first = bisect_left(intervals, (x0, x0))
+            if first and intervals[first - 1][1] >= x0 - 1:
+                first -= 1
+            last = first
+            start, end = x0, x1
+            count = len(intervals)
+            while last < count and intervals[last][0] <= x1 + 1:
+                interval_start, interval_end = intervals[last]
+                if interval_start < start:
+                    start = interval_start
+                if interval_end > end:
+                    end = interval_end
+                last += 1
+            intervals[first:last] = [(start, end)]
 
     def _segment_blocked(
         self, occupied: Dict[int, List[Tuple[int, int]]], y: int, x0: int, x1: int
     ) -> bool:
         if x0 > x1:
             x0, x1 = x1, x0
-        for start, end in occupied.get(y, []):
-            if start <= x1 and x0 <= end:
-                return True
-        return False
+        intervals = occupied.get(y)
+        if not intervals:
+            return False
+        index = bisect_right(intervals, (x1, _INF))
+        return index > 0 and intervals[index - 1][1] >= x0
 
     def _ensure_branch_row_clear(
         self,
@@ -1000,16 +1190,22 @@ class Diagram:
         occupied: Dict[int, List[Tuple[int, int]]],
     ) -> int:
         parent_center = node.x + node.box_width // 2
+        spans = []
+        for child in children:
+            child_center = child.x + child.box_width // 2
+            if parent_center <= child_center:
+                spans.append((child, child_center, parent_center, child_center))
+            else:
+                spans.append((child, child_center, child_center, parent_center))
+        segment_blocked = self._segment_blocked
         while True:
             collision = False
-            for child in children:
-                child_center = child.x + child.box_width // 2
-                min_x, max_x = sorted((parent_center, child_center))
-                if self._segment_blocked(occupied, branch_y, min_x, max_x):
+            for child, child_center, min_x, max_x in spans:
+                if segment_blocked(occupied, branch_y, min_x, max_x):
                     collision = True
                     break
                 for y in range(branch_y + 1, child.y):
-                    if self._segment_blocked(occupied, y, child_center, child_center):
+                    if segment_blocked(occupied, y, child_center, child_center):
                         collision = True
                         break
                 if collision:
@@ -1028,24 +1224,46 @@ class Diagram:
                 branch_y = max_allowed
 
     def _collect_rects(self, node: Node, rects: List[Tuple[int, int, int, int]]):
-        rects.append(
-            (node.x, node.x + node.box_width - 1, node.y, node.y + node.height - 1)
-        )
-        for child, _ in node.children:
-            self._collect_rects(child, rects)
+        stack = [(node, 0)]
+        while stack:
+            current, dy = stack.pop()
+            x = current.x
+            y = current.y + dy
+            rects.append((x, x + current.box_width - 1, y, y + current.height - 1))
+            child_dy = dy + current.pending_y_offset
+            stack.extend((child, child_dy) for child in reversed(current.child_nodes))
+
+    def _subtree_rects(self, node: Node) -> List[Tuple[int, int, int, int]]:
+        cached = self._rects_cache.get(id(node))
+        if cached is None:
+            rects: List[Tuple[int, int, int, int]] = []
+            self._collect_rects(node, rects)
+            base_x = node.x
+            base_y = node.y
+            cached = [
+                (x0 - base_x, x1 - base_x, y0 - base_y, y1 - base_y)
+                for x0, x1, y0, y1 in rects
+            ]
+            self._rects_cache[id(node)] = cached
+        return cached
 
     def _subtree_overlap_delta(
         self, node: Node, occupied: Dict[int, List[Tuple[int, int]]]
     ) -> int:
-        rects: List[Tuple[int, int, int, int]] = []
-        self._collect_rects(node, rects)
+        base_x = node.x
+        base_y = node.y
+        rects = [
+            (x0 + base_x, x1 + base_x, y0 + base_y, y1 + base_y)
+            for x0, x1, y0, y1 in self._subtree_rects(node)
+        ]
+        segment_blocked = self._segment_blocked
         delta = 0
         while True:
             collision = False
             for x0, x1, y0, y1 in rects:
-                for y in range(y0 + delta, y1 + delta + 1):
-                    if self._segment_blocked(occupied, y, x0, x1):
-                        delta += 1
+                for y in range(y1 + delta, y0 + delta - 1, -1):
+                    if segment_blocked(occupied, y, x0, x1):
+                        delta = y - y0 + 1
                         collision = True
                         break
                 if collision:
@@ -1056,12 +1274,31 @@ class Diagram:
     def _compute_row_overlap_delta(
         self, children: List[Node], occupied: Dict[int, List[Tuple[int, int]]]
     ) -> int:
+        if not occupied:
+            return 0
+        bottom = max(occupied)
         max_delta = 0
         for child in children:
+            top = child.y + min(rect[2] for rect in self._subtree_rects(child))
+            if bottom - top + 1 <= max_delta:
+                continue
             max_delta = max(max_delta, self._subtree_overlap_delta(child, occupied))
         return max_delta
 
     def _auto_avoid_node(self, node: Node, occupied: Dict[int, List[Tuple[int, int]]]):
+        stack: List[Tuple[Node, Optional[Position]]] = [(node, None)]
+        while stack:
+            current, position = stack.pop()
+            if position is not None and position != Position.TOP:
+                delta = self._subtree_overlap_delta(current, occupied)
+                if delta:
+                    self._shift_subtree(current, delta)
+            stack.extend(reversed(self._auto_avoid_place(current, occupied)))
+
+    def _auto_avoid_place(
+        self, node: Node, occupied: Dict[int, List[Tuple[int, int]]]
+    ) -> List[Tuple[Node, Position]]:
+        self._apply_pending_offset(node)
         self._occupy_rect(
             occupied,
             node.x,
@@ -1070,23 +1307,25 @@ class Diagram:
             node.y + node.height - 1,
         )
 
-        top_children = [child for child, pos in node.children if pos == Position.TOP]
+        parent_center = node.x + node.box_width // 2
+        children_by_x = sorted(node.children, key=lambda item: item[0].x)
+        top_children = [child for child, pos in children_by_x if pos == Position.TOP]
         if top_children:
             rows: Dict[int, List[Node]] = {}
             for child in top_children:
                 rows.setdefault(child.branch_row_index, []).append(child)
 
             for row_index in sorted(rows.keys()):
-                row_children = sorted(rows[row_index], key=lambda c: c.x)
-                if not row_children:
-                    continue
+                row_children = rows[row_index]
                 branch_y = row_children[0].branch_anchor_y
                 if branch_y is None:
                     continue
-                parent_center = node.x + node.box_width // 2
                 for child_node in row_children:
                     child_center = child_node.x + child_node.box_width // 2
-                    min_x, max_x = sorted((parent_center, child_center))
+                    if parent_center <= child_center:
+                        min_x, max_x = parent_center, child_center
+                    else:
+                        min_x, max_x = child_center, parent_center
                     self._occupy_rect(occupied, min_x, max_x, branch_y, branch_y)
                     child_bottom = child_node.y + child_node.height - 1
                     if child_bottom + 1 <= branch_y - 1:
@@ -1099,7 +1338,7 @@ class Diagram:
                         )
 
         bottom_children = [
-            child for child, pos in node.children if pos == Position.BOTTOM
+            child for child, pos in children_by_x if pos == Position.BOTTOM
         ]
         if bottom_children:
             rows: Dict[int, List[Node]] = {}
@@ -1107,9 +1346,7 @@ class Diagram:
                 rows.setdefault(child.branch_row_index, []).append(child)
 
             for row_index in sorted(rows.keys()):
-                row_children = sorted(rows[row_index], key=lambda c: c.x)
-                if not row_children:
-                    continue
+                row_children = rows[row_index]
                 branch_y = row_children[0].branch_anchor_y
                 if branch_y is None:
                     branch_y = node.y + node.height + 1
@@ -1125,7 +1362,6 @@ class Diagram:
                         continue
                     break
 
-                parent_center = node.x + node.box_width // 2
                 for child in row_children:
                     child.branch_anchor_y = branch_y
                     child_center = child.x + child.box_width // 2
@@ -1133,8 +1369,10 @@ class Diagram:
                     if gap < 2:
                         self._shift_subtree(child, 2 - gap)
                         child.branch_anchor_y = branch_y
-                        child_center = child.x + child.box_width // 2
-                    min_x, max_x = sorted((parent_center, child_center))
+                    if parent_center <= child_center:
+                        min_x, max_x = parent_center, child_center
+                    else:
+                        min_x, max_x = child_center, parent_center
                     self._occupy_rect(occupied, min_x, max_x, branch_y, branch_y)
                     if child.y > branch_y + 1:
                         self._occupy_rect(
@@ -1145,18 +1383,15 @@ class Diagram:
                             child.y - 1,
                         )
 
-        for child, pos in sorted(node.children, key=lambda item: item[0].x):
-            if pos == Position.TOP:
-                self._auto_avoid_node(child, occupied)
-                continue
-            delta = self._subtree_overlap_delta(child, occupied)
-            if delta:
-                self._shift_subtree(child, delta)
-            self._auto_avoid_node(child, occupied)
+        return children_by_x
 
     def _auto_avoid(self):
-        occupied: Dict[int, List[Tuple[int, int]]] = {}
+        occupied: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        self._rects_cache = {}
         self._auto_avoid_node(self.root, occupied)
+        self._rects_cache = {}
+        for node in self._walk_subtree(self.root):
+            self._apply_pending_offset(node)
 
     def _draw_box(self, canvas: Canvas, node: Node):
         shape = getattr(node, "shape", Shape.RECTANGLE)
@@ -1182,14 +1417,13 @@ class Diagram:
         if not tokens_lines:
             plain_line = node.text if node.text else ""
             tokens_lines = [
-                [("text", char, max(wcwidth(char), 1)) for char in plain_line]
+                [("text", char, _char_width(char)) for char in plain_line]
             ]
         content_height = len(tokens_lines)
         bottom_y = y + content_height + 1
 
         canvas.set(x, y, self.chars.top_left)
-        for i in range(1, w - 1):
-            canvas.set(x + i, y, self.chars.horizontal)
+        canvas.fill_row(y, x + 1, x + w - 1, self.chars.horizontal)
         canvas.set(x + w - 1, y, self.chars.top_right)
 
         if getattr(node, "title_tokens", None):
@@ -1227,8 +1461,7 @@ class Diagram:
             canvas.set(x, line_y, self.chars.vertical)
             canvas.set(x + w - 1, line_y, self.chars.vertical)
 
-            for i in range(inner_width):
-                canvas.set(x + 1 + i, line_y, " ")
+            canvas.fill_row(line_y, x + 1, x + 1 + inner_width, " ")
 
             display_width = sum(token[2] for token in line_tokens if token[0] == "text")
             padding = 0
@@ -1253,8 +1486,7 @@ class Diagram:
                 canvas.insert_markup(cursor, line_y, tag)
 
         canvas.set(x, bottom_y, self.chars.bottom_left)
-        for i in range(1, w - 1):
-            canvas.set(x + i, bottom_y, self.chars.horizontal)
+        canvas.fill_row(bottom_y, x + 1, x + w - 1, self.chars.horizontal)
         canvas.set(x + w - 1, bottom_y, self.chars.bottom_right)
 
     def _draw_diamond(self, canvas: Canvas, node: Node):
@@ -1328,16 +1560,14 @@ class Diagram:
         # Draw hexagon outline
         third = w // 3
         canvas.set(x + third, y, "╱")
-        for i in range(third):
-            canvas.set(x + third + i, y, "─")
+        canvas.fill_row(y, x + third, x + 2 * third, "─")
         canvas.set(x + 2 * third, y, "╲")
 
         canvas.set(x, y + h // 2, "│")
         canvas.set(x + w - 1, y + h // 2, "│")
 
         canvas.set(x + third, y + h - 1, "╲")
-        for i in range(third):
-            canvas.set(x + third + i, y + h - 1, "─")
+        canvas.fill_row(y + h - 1, x + third, x + 2 * third, "─")
         canvas.set(x + 2 * third, y + h - 1, "╱")
 
         # Fill sides
@@ -1363,15 +1593,14 @@ class Diagram:
         if not tokens_lines:
             plain_line = node.text if node.text else ""
             tokens_lines = [
-                [("text", char, max(wcwidth(char), 1)) for char in plain_line]
+                [("text", char, _char_width(char)) for char in plain_line]
             ]
         content_height = len(tokens_lines)
         bottom_y = y + content_height + 1
 
         # Draw double-line border
         canvas.set(x, y, "╔")
-        for i in range(1, w - 1):
-            canvas.set(x + i, y, "═")
+        canvas.fill_row(y, x + 1, x + w - 1, "═")
         canvas.set(x + w - 1, y, "╗")
 
         for idx, line_tokens in enumerate(tokens_lines):
@@ -1379,8 +1608,7 @@ class Diagram:
             canvas.set(x, line_y, "║")
             canvas.set(x + w - 1, line_y, "║")
 
-            for i in range(inner_width):
-                canvas.set(x + 1 + i, line_y, " ")
+            canvas.fill_row(line_y, x + 1, x + 1 + inner_width, " ")
 
             display_width = sum(token[2] for token in line_tokens if token[0] == "text")
             padding = 0
@@ -1405,37 +1633,19 @@ class Diagram:
                 canvas.insert_markup(cursor, line_y, tag)
 
         canvas.set(x, bottom_y, "╚")
-        for i in range(1, w - 1):
-            canvas.set(x + i, bottom_y, "═")
+        canvas.fill_row(bottom_y, x + 1, x + w - 1, "═")
         canvas.set(x + w - 1, bottom_y, "╝")
 
     def _edge_anchor(
-        self, node: Node, other: Node, outgoing: bool, prefer_horizontal: bool
+        self, node: Node, other: Node, prefer_horizontal: bool
     ) -> Tuple[int, int, str]:
-        center_x = node.x + node.box_width // 2
-        center_y = node.y + node.height // 2
-        other_center_x = other.x + other.box_width // 2
-        other_center_y = other.y + other.height // 2
-        dx = other_center_x - center_x
-        dy = other_center_y - center_y
-
         if prefer_horizontal:
-            if (dx >= 0 and outgoing) or (dx < 0 and not outgoing):
-                x = node.x + node.box_width if outgoing else node.x - 1
-                direction = "right" if outgoing else "left"
-            else:
-                x = node.x - 1 if outgoing else node.x + node.box_width
-                direction = "left" if outgoing else "right"
-            y = center_y
-        else:
-            if (dy >= 0 and outgoing) or (dy < 0 and not outgoing):
-                y = node.y + node.height if outgoing else node.y - 1
-                direction = "down" if outgoing else "up"
-            else:
-                y = node.y - 1 if outgoing else node.y + node.height
-                direction = "up" if outgoing else "down"
-            x = center_x
-        return x, y, direction
+            if other.center_x >= node.center_x:
+                return node.x + node.box_width, node.center_y, "right"
+            return node.x - 1, node.center_y, "left"
+        if other.center_y >= node.center_y:
+            return node.center_x, node.y + node.height, "down"
+        return node.center_x, node.y - 1, "up"
 
     def _edge_path(
         self, start: Tuple[int, int], end: Tuple[int, int], prefer_horizontal: bool
@@ -1465,25 +1675,14 @@ class Diagram:
         dy1 = cur[1] - prev[1]
         dx2 = nxt[0] - cur[0]
         dy2 = nxt[1] - cur[1]
-        if dx1 == 0 and dy2 == 0:
-            if dy1 > 0 and dx2 > 0:
-                return self.chars.bottom_left
-            if dy1 > 0 and dx2 < 0:
-                return self.chars.bottom_right
-            if dy1 < 0 and dx2 > 0:
-                return self.chars.top_left
-            if dy1 < 0 and dx2 < 0:
-                return self.chars.top_right
-        if dy1 == 0 and dx2 == 0:
-            if dx1 > 0 and dy2 > 0:
-                return self.chars.top_right
-            if dx1 > 0 and dy2 < 0:
-                return self.chars.bottom_right
-            if dx1 < 0 and dy2 > 0:
-                return self.chars.top_left
-            if dx1 < 0 and dy2 < 0:
-                return self.chars.bottom_left
-        return None
+        return self._corner_map().get(
+            (
+                (dx1 > 0) - (dx1 < 0),
+                (dy1 > 0) - (dy1 < 0),
+                (dx2 > 0) - (dx2 < 0),
+                (dy2 > 0) - (dy2 < 0),
+            )
+        )
 
     def _draw_corner_if_needed(
         self,
@@ -1503,34 +1702,29 @@ class Diagram:
         if incoming == outgoing:
             return
         x, y = cur
-        existing = self._edge_state.get((x, y))
-        if existing:
-            existing["dirs"].update({incoming, outgoing})
-            existing["is_corner"] = True
-            if style and not existing.get("style"):
-                existing["style"] = style
-        else:
-            data: Dict[str, object] = {
-                "dirs": {incoming, outgoing},
-                "is_corner": True,
-                "arrow": None,
-            }
-            if style:
-                data["style"] = style
-            self._edge_state[(x, y)] = data
-        state = self._edge_state[(x, y)]
+        index = self._edge_cell(x, y)
+        if index < 0:
+            return
+        self._edge_dirs[index] |= _DIR_BITS[incoming] | _DIR_BITS[outgoing]
+        self._edge_track[index] = self._edge_dirs[index] | self._edge_arrows[index]
+        if not self._edge_flags[index] & _EDGE_CORNER:
+            self._edge_flags[index] |= _EDGE_CORNER
+            self._edge_cost[index] += _CORNER_PENALTY
+        if style and index not in self._edge_styles:
+            self._edge_styles[index] = style
+        corner_chars = self._edge_corner_chars
         if problem_corners and (x, y) in problem_corners:
-            state["corner_char"] = "•"
+            corner_chars[index] = "•"
             return
         corner = self._dirs_to_corner(prev, cur, nxt)
         if corner:
-            existing_corner = state.get("corner_char")
+            existing_corner = corner_chars.get(index)
             if existing_corner and existing_corner != corner:
-                state["corner_char"] = "•"
+                corner_chars[index] = "•"
             else:
-                state["corner_char"] = corner
+                corner_chars[index] = corner
         else:
-            state["corner_char"] = "•"
+            corner_chars[index] = "•"
 
     def _draw_segment(
         self,
@@ -1545,31 +1739,64 @@ class Diagram:
             return
         if x0 == x1:
             step = 1 if y1 > y0 else -1
-            y = y0
-            while y != y1:
-                key = (x0, y)
-                state = self._edge_state.setdefault(
-                    key, {"dirs": set(), "is_corner": False, "arrow": None}
-                )
-                if style and "style" not in state:
-                    state["style"] = style
-                state["dirs"].update({"up", "down"})
-                y += step
+            self._mark_edge_run(x0, y0, 0, step, abs(y1 - y0), DIR_UP | DIR_DOWN, style)
         elif y0 == y1:
             step = 1 if x1 > x0 else -1
-            x = x0
-            while x != x1:
-                key = (x, y0)
-                state = self._edge_state.setdefault(
-                    key, {"dirs": set(), "is_corner": False, "arrow": None}
-                )
-                if style and "style" not in state:
-                    state["style"] = style
-                state["dirs"].update({"left", "right"})
-                x += step
+            self._mark_edge_run(
+                x0, y0, step, 0, abs(x1 - x0), DIR_LEFT | DIR_RIGHT, style
+            )
         else:
             raise DiagramError("Edge segment must be orthogonal.")
 
+    def _mark_edge_run(
+        self,
+        x: int,
+        y: int,
+        dx: int,
+        dy: int,
+        count: int,
+        mask: int,
+        style: Optional[str],
+    ) -> None:
+        width = self.canvas_width
+        first = 0
+        last = count
+        for coord, delta, limit in ((x, dx, width), (y, dy, self.canvas_height)):
+            if delta > 0:
+                first = max(first, -coord)
+                last = min(last, limit - coord)
+            elif delta < 0:
+                first = max(first, coord - limit + 1)
+                last = min(last, coord + 1)
+            elif not 0 <= coord < limit:
+                last = 0
+        if first > 0 or last < count:
+            k = 0 if first > 0 or last <= first else last
+            self._edge_overflow.append((x + k * dx, y + k * dy))
+        if last <= first:
+            return
+        stride = dy * width + dx
+        begin = (y + first * dy) * width + x + first * dx
+        if stride < 0:
+            begin += (last - first - 1) * stride
+            stride = -stride
+        run = slice(begin, begin + (last - first) * stride, stride)
+        table = _DIR_OR_TABLES[mask]
+        dirs = self._edge_dirs
+        dirs[run] = dirs[run].translate(table)
+        track = self._edge_track
+        track[run] = track[run].translate(table)
+        flags = self._edge_flags[run]
+        offset = flags.find(0)
+        while offset != -1:
+            self._add_edge_cell(begin + offset * stride)
+            offset = flags.find(0, offset + 1)
+        if style:
+            styles = self._edge_styles
+            for index in range(run.start, run.stop, stride):
+                if index not in styles:
+                    styles[index] = style
+
     def _opposite_dir(self, direction: str) -> str:
         mapping = {"up": "down", "down": "up", "left": "right", "right": "left"}
         return mapping.get(direction, direction)
@@ -1591,18 +1818,37 @@ class Diagram:
             x, y = pos
             self._set_connector_char(canvas, x, y, arrow_map[direction], style)
 
-    def _build_edge_occupancy(self) -> Set[Tuple[int, int]]:
+    def _edge_occupancy(
+        self,
+    ) -> Tuple[bytearray, bytearray, Dict[int, Tuple[int, int]]]:
         rects: List[Tuple[int, int, int, int]] = []
         self._collect_rects(self.root, rects)
-        blocked: Set[Tuple[int, int]] = set()
+        key = (self.canvas_width, self.canvas_height, tuple(rects))
+        cached = self._occupancy_cache
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2], cached[3]
+        hard_blocked = self._build_edge_occupancy(rects)
+        adjacent = self._blocked_neighbour_counts(hard_blocked)
+        nearest: Dict[int, Tuple[int, int]] = {}
+        self._occupancy_cache = (key, hard_blocked, adjacent, nearest)
+        return hard_blocked, adjacent, nearest
+
+    def _build_edge_occupancy(
+        self, rects: List[Tuple[int, int, int, int]]
+    ) -> bytearray:
+        width = self.canvas_width
+        blocked = bytearray(width * self.canvas_height)
         for x0, x1, y0, y1 in rects:
             min_x = max(0, x0 - 1)
-            max_x = min(self.canvas_width - 1, x1 + 1)
+            max_x = min(width - 1, x1 + 1)
             min_y = max(0, y0 - 1)
             max_y = min(self.canvas_height - 1, y1 + 1)
+            if min_x > max_x:
+                continue
+            span = b"\x01" * (max_x - min_x + 1)
             for y in range(min_y, max_y + 1):
-                for x in range(min_x, max_x + 1):
-                    blocked.add((x, y))
+                row_start = y * width + min_x
+                blocked[row_start : row_start + len(span)] = span
         return blocked
 
     def _simplify_path(self, path: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
@@ -1632,30 +1878,35 @@ class Diagram:
         self,
         start: Tuple[int, int],
         end: Tuple[int, int],
-        blocked: Set[Tuple[int, int]],
+        blocked: bytearray,
     ) -> bool:
+        width = self.canvas_width
+        height = self.canvas_height
         x0, y0 = start
         x1, y1 = end
+        if start == end:
+            return False
         if x0 == x1:
-            step = 1 if y1 > y0 else -1
-            y = y0 + step
-            while y != y1:
-                if (x0, y) in blocked:
-                    return False
-                y += step
-            return True
+            if not 0 <= x0 < width:
+                return True
+            low = max(min(y0, y1) + 1, 0)
+            high = min(max(y0, y1), height)
+            if low >= high:
+                return True
+            return 1 not in blocked[low * width + x0 : high * width : width]
         if y0 == y1:
-            step = 1 if x1 > x0 else -1
-            x = x0 + step
-            while x != x1:
-                if (x, y0) in blocked:
-                    return False
-                x += step
-            return True
+            if not 0 <= y0 < height:
+                return True
+            low = max(min(x0, x1) + 1, 0)
+            high = min(max(x0, x1), width)
+            if low >= high:
+                return True
+            row_start = y0 * width
+            return blocked.find(1, row_start + low, row_start + high) == -1
         return False
 
     def _smooth_path(
-        self, path: List[Tuple[int, int]], blocked: Set[Tuple[int, int]]
+        self, path: List[Tuple[int, int]], blocked: bytearray
     ) -> List[Tuple[int, int]]:
         if len(path) <= 2:
             return path
@@ -1701,8 +1952,7 @@ class Diagram:
         if not tokens:
             return
         open_tag, close_tag = tokens
-        canvas.insert_markup(x, y, open_tag, position="prefix")
-        canvas.insert_markup(x, y, close_tag, position="suffix")
+        canvas.insert_markup_batch(((x, y, open_tag, close_tag),))
 
     def _set_connector_char(
         self, canvas: Canvas, x: int, y: int, char: str, style: Optional[str]
@@ -1714,7 +1964,7 @@ class Diagram:
     def _detour_zigzag(
         self,
         path: List[Tuple[int, int]],
-        blocked: Set[Tuple[int, int]],
+        blocked: bytearray,
     ) -> List[Tuple[int, int]]:
         if len(path) < 4:
             return path
@@ -1749,7 +1999,7 @@ class Diagram:
                     if (
                         0 <= candidate[0] < self.canvas_width
                         and 0 <= candidate[1] < self.canvas_height
-                        and candidate not in blocked
+                        and not blocked[candidate[1] * self.canvas_width + candidate[0]]
                         and candidate != next_corner
                         and candidate != after
                     ):
@@ -1768,214 +2018,242 @@ class Diagram:
         return path
 
     def _direction_from_step(self, dx: int, dy: int) -> Optional[str]:
-        if dx > 0:
-            return "right"
-        if dx < 0:
-            return "left"
-        if dy > 0:
-            return "down"
-        if dy < 0:
-            return "up"
-        return None
+        return _STEP_DIRECTIONS[(dy > 0) - (dy < 0) + 1][(dx > 0) - (dx < 0) + 1]
 
     def _route_edge(
         self,
         start: Tuple[int, int],
         end: Tuple[int, int],
-        hard_blocked: Set[Tuple[int, int]],
+        hard_blocked: bytearray,
+        nearest: Optional[Dict[int, Tuple[int, int]]] = None,
     ) -> Optional[List[Tuple[int, int]]]:
         if start == end:
             return [start]
 
+        width = self.canvas_width
+        height = self.canvas_height
+
+        def inside(point: Tuple[int, int]) -> bool:
+            return 0 <= point[0] < width and 0 <= point[1] < height
+
+        if nearest is None:
+            nearest = {}
+
         def nearest_free(point: Tuple[int, int]) -> Tuple[int, int]:
             x, y = point
-            if (x, y) not in hard_blocked:
+            if not inside(point) or not hard_blocked[y * width + x]:
                 return (x, y)
-            queue = deque([point])
-            seen = {point}
-            moves = [(1, 0), (-1, 0), (0, 1), (0, -1)]
-            while queue:
-                px, py = queue.popleft()
-                for dx, dy in moves:
-                    nx, ny = px + dx, py + dy
-                    if not (
-                        0 <= nx < self.canvas_width and 0 <= ny < self.canvas_height
-                    ):
-                        continue
-                    if (nx, ny) in seen:
-                        continue
-                    if (nx, ny) not in hard_blocked:
-                        return (nx, ny)
-                    seen.add((nx, ny))
-                    queue.append((nx, ny))
-            return point
+            origin = y * width + x
+            found = nearest.get(origin)
+            if found is None:
+                found = nearest[origin] = self._nearest_free_cell(
+                    point, hard_blocked
+                )
+            return found
 
         start = nearest_free(start)
         end = nearest_free(end)
 
-        moves = [
-            (1, 0, "right"),
-            (-1, 0, "left"),
-            (0, 1, "down"),
-            (0, -1, "up"),
-        ]
-
-        blocked = set(hard_blocked)
-        blocked.discard(start)
-        blocked.discard(end)
+        blocked = bytearray(hard_blocked)
+        for point in (start, end):
+            if inside(point):
+                blocked[point[1] * width + point[0]] = 0
 
-        edge_state = self._edge_state
+        cost = bytearray(self._edge_cost)
+        track = bytearray(self._edge_track)
+        for point in {start, end}:
+            x, y = point
+            if inside(point) and hard_blocked[y * width + x]:
+                for ny in range(max(0, y - 1), min(height, y + 2)):
+                    for nx in range(max(0, x - 1), min(width, x + 2)):
+                        if nx != x or ny != y:
+                            cost[ny * width + nx] -= 1
 
         turn_penalty = 3
         zigzag_penalty = 6
-        proximity_penalty = 1
         shared_track_penalty = 4
         cross_penalty = 24
-        corner_penalty = 12
-        track_proximity_penalty = 2
 
-        def heuristic(point: Tuple[int, int]) -> int:
-            return abs(point[0] - end[0]) + abs(point[1] - end[1])
+        edge_flags = self._edge_flags
+        end_x, end_y = end
+        end_index = end_y * width + end_x if inside(end) else -1
+        if end_index >= 0:
+            end_present = edge_flags[end_index]
+            for nx, ny in (
+                (end_x - 1, end_y),
+                (end_x + 1, end_y),
+                (end_x, end_y - 1),
+                (end_x, end_y + 1),
+            ):
+                if 0 <= nx < width and 0 <= ny < height:
+                    neighbour = ny * width + nx
+                    if end_present:
+                        cost[neighbour] -= _TRACK_PROXIMITY_PENALTY
+                    if edge_flags[neighbour]:
+                        cost[end_index] -= _TRACK_PROXIMITY_PENALTY
+            if edge_flags[end_index] & _EDGE_CORNER:
+                cost[end_index] -= _CORNER_PENALTY
+            track[end_index] = 0
+
+        offset_x = -min(0, start[0], end_x)
+        offset_y = -min(0, start[1], end_y)
+        column_height = max(height, start[1] + 1, end_y + 1) + offset_y
+
+        def encode(x: int, y: int) -> int:
+            return (x + offset_x) * column_height + y + offset_y
+
+        end_cell = encode(end_x, end_y)
+        start_state = (encode(*start) * 5 + _NO_STEP) * 5 + _NO_STEP
+        steps = [
+            (dx, dy, direction, axis, dx * column_height + dy, dy * width + dx)
+            for dx, dy, direction, axis in _ROUTE_STEPS
+        ]
+        open_heap: List[Tuple[int, int, int]] = []
+        start_priority = abs(start[0] - end_x) + abs(start[1] - end_y)
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+        heappush(open_heap, (start_priority, 0, start_state))
 
-        def adjacent_penalty(point: Tuple[int, int]) -> int:
-            x, y = point
-            penalty = 0
-            for dx in (-1, 0, 1):
-                for dy in (-1, 0, 1):
-                    if dx == 0 and dy == 0:
-                        continue
-                    nx, ny = x + dx, y + dy
-                    if not (
-                        0 <= nx < self.canvas_width and 0 <= ny < self.canvas_height
-                    ):
-                        continue
-                    if (nx, ny) in blocked:
-                        penalty += 1
-            return penalty
-
-        def edge_penalty(point: Tuple[int, int], direction: str) -> int:
-            if point == end:
-                return 0
-            info = edge_state.get(point)
-            penalty = 0
-            if info:
-                dirs = set(info.get("dirs", set()))
-                arrow_dir = info.get("arrow")
-                if arrow_dir:
-                    dirs.add(arrow_dir)
-                if info.get("is_corner") and info.get("corner_char"):
-                    penalty += corner_penalty
-                if dirs:
-                    opp = self._opposite_dir(direction)
-                    if direction in dirs or (opp and opp in dirs):
-                        penalty += shared_track_penalty
-                    else:
-                        penalty += cross_penalty
-            x, y = point
-            for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
-                nx, ny = x + dx, y + dy
-                if not (0 <= nx < self.canvas_width and 0 <= ny < self.canvas_height):
-                    continue
-                if (nx, ny) == end:
-                    continue
-                neighbor = edge_state.get((nx, ny))
-                if neighbor:
-                    penalty += track_proximity_penalty
-            return penalty
-
-        start_state = (start, None, None)
-        open_heap: List[
-            Tuple[int, int, Tuple[int, int], Optional[str], Optional[str]]
-        ] = []
-        start_priority = heuristic(start)
-        heapq.heappush(open_heap, (start_priority, 0, start, None, None))
-
-        came: Dict[
-            Tuple[Tuple[int, int], Optional[str], Optional[str]],
-            Tuple[Tuple[int, int], Optional[str], Optional[str]],
-        ] = {}
-        best_cost: Dict[Tuple[Tuple[int, int], Optional[str], Optional[str]], int] = {
-            start_state: 0
-        }
-        goal_state: Optional[Tuple[Tuple[int, int], Optional[str], Optional[str]]] = (
-            None
-        )
+        came: Dict[int, int] = {}
+        best_cost: Dict[int, int] = {start_state: 0}
+        best_cost_get = best_cost.get
+        goal_state: Optional[int] = None
 
         while open_heap:
-            f_cost, g_cost, (x, y), prev_dir, prev_prev_dir = heapq.heappop(open_heap)
-            current_state = ((x, y), prev_dir, prev_prev_dir)
-            recorded = best_cost.get(current_state)
+            f_cost, g_cost, current_state = heappop(open_heap)
+            recorded = best_cost_get(current_state)
             if recorded is not None and g_cost > recorded:
                 continue
-            if (x, y) == end:
+            cell, prev_dir = divmod(current_state // 5, 5)
+            if cell == end_cell:
                 goal_state = current_state
                 break
-
-            for dx, dy, direction in moves:
-                nx, ny = x + dx, y + dy
-                if not (0 <= nx < self.canvas_width and 0 <= ny < self.canvas_height):
+            prev_prev_dir = current_state % 5
+            x, y = divmod(cell, column_height)
+            x -= offset_x
+            y -= offset_y
+            base_index = y * width + x
+            turned_cost = 1 + turn_penalty
+            zigzag_dir = -1
+            if prev_prev_dir != _NO_STEP and prev_dir != prev_prev_dir:
+                zigzag_dir = prev_prev_dir
+
+            for dx, dy, direction, axis, cell_step, index_step in steps:
+                nx = x + dx
+                ny = y + dy
+                if not (0 <= nx < width and 0 <= ny < height):
                     continue
-                if (nx, ny) in blocked:
+                index = base_index + index_step
+                if blocked[index]:
                     continue
 
-                step_cost = 1
-                if prev_dir is not None and direction != prev_dir:
-                    step_cost += turn_penalty
-                    if (
-                        prev_prev_dir is not None
-                        and prev_dir != prev_prev_dir
-                        and direction == prev_prev_dir
-                    ):
+                if prev_dir != _NO_STEP and direction != prev_dir:
+                    step_cost = turned_cost
+                    if direction == zigzag_dir:
                         step_cost += zigzag_penalty
-                step_cost += proximity_penalty * adjacent_penalty((nx, ny))
-                step_cost += edge_penalty((nx, ny), direction)
+                else:
+                    step_cost = 1
+                step_cost += cost[index]
+                dirs = track[index]
+                if dirs:
+                    if dirs & axis:
+                        step_cost += shared_track_penalty
+                    else:
+                        step_cost += cross_penalty
 
                 next_cost = g_cost + step_cost
-                next_state = ((nx, ny), direction, prev_dir)
-                if next_cost >= best_cost.get(next_state, float("inf")):
+                next_state = ((cell + cell_step) * 5 + direction) * 5 + prev_dir
+                if next_cost >= best_cost_get(next_state, _INF):
                     continue
 
                 best_cost[next_state] = next_cost
                 came[next_state] = current_state
-                priority = next_cost + heuristic((nx, ny))
-                heapq.heappush(
-                    open_heap, (priority, next_cost, (nx, ny), direction, prev_dir)
-                )
+                priority = next_cost + abs(nx - end_x) + abs(ny - end_y)
+                heappush(open_heap, (priority, next_cost, next_state))
 
         if goal_state is None:
             return None
 
         path: List[Tuple[int, int]] = []
-        state: Optional[Tuple[Tuple[int, int], Optional[str], Optional[str]]] = (
-            goal_state
-        )
+        state: Optional[int] = goal_state
         while state is not None:
-            point, _, _ = state
-            path.append(point)
+            x, y = divmod(state // 25, column_height)
+            path.append((x - offset_x, y - offset_y))
             state = came.get(state)
         path.reverse()
 
         path = self._smooth_path(path, blocked)
         return path
 
-    def _reserve_edge_track(
-        self, occupied: Set[Tuple[int, int]], point: Tuple[int, int]
-    ) -> None:
+    def _nearest_free_cell(
+        self, point: Tuple[int, int], hard_blocked: bytearray
+    ) -> Tuple[int, int]:
+        width = self.canvas_width
+        height = self.canvas_height
+        origin = point[1] * width + point[0]
+        queue = deque([origin])
+        seen = {origin}
+        while queue:
+            index = queue.popleft()
+            y, x = divmod(index, width)
+            for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if not (0 <= nx < width and 0 <= ny < height):
+                    continue
+                neighbour = ny * width + nx
+                if neighbour in seen:
+                    continue
+                if not hard_blocked[neighbour]:
+                    return (nx, ny)
+                seen.add(neighbour)
+                queue.append(neighbour)
+        return point
+
+    def _blocked_neighbour_counts(self, blocked: bytearray) -> bytearray:
+        width = self.canvas_width
+        height = self.canvas_height
+        counts = bytearray(len(blocked))
+        index = blocked.find(1)
+        while index != -1:
+            y, x = divmod(index, width)
+            x_start = max(0, x - 1)
+            x_stop = min(width, x + 2)
+            for ny in range(max(0, y - 1), min(height, y + 2)):
+                row = ny * width
+                for nx in range(x_start, x_stop):
+                    counts[row + nx] += 1
+            counts[index] -= 1
+            index = blocked.find(1, index + 1)
+        return counts
+
+    def _reserve_edge_track(self, occupied: bytearray, point: Tuple[int, int]) -> None:
         x, y = point
-        if not (0 <= x < self.canvas_width and 0 <= y < self.canvas_height):
+        width = self.canvas_width
+        if not (0 <= x < width and 0 <= y < self.canvas_height):
             return
-        occupied.add((x, y))
+        occupied[y * width + x] = 1
         for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
             nx, ny = x + dx, y + dy
-            if 0 <= nx < self.canvas_width and 0 <= ny < self.canvas_height:
-                occupied.add((nx, ny))
+            if 0 <= nx < width and 0 <= ny < self.canvas_height:
+                occupied[ny * width + nx] = 1
+
+    def _reserve_edge_run(self, occupied: bytearray, x0: int, x1: int, y: int) -> None:
+        width = self.canvas_width
+        row_start = y * width
+        low = max(0, x0 - 1)
+        high = min(width, x1 + 2)
+        occupied[row_start + low : row_start + high] = b"\x01" * (high - low)
+        span = b"\x01" * (x1 - x0 + 1)
+        if y > 0:
+            occupied[row_start - width + x0 : row_start - width + x1 + 1] = span
+        if y < self.canvas_height - 1:
+            occupied[row_start + width + x0 : row_start + width + x1 + 1] = span
 
     def _draw_edge_label(
         self,
         canvas: Canvas,
         edge: Edge,
         path_points: List[Tuple[int, int]],
-        occupied: Set[Tuple[int, int]],
+        occupied: bytearray,
     ) -> List[Tuple[int, int]]:
         label = (edge.label or "").strip()
         if not label or len(path_points) < 2:
@@ -2008,14 +2286,15 @@ class Diagram:
         def can_place(start_x: int, y: int) -> bool:
             if not (0 <= y < self.canvas_height):
                 return False
-            for offset, _ in enumerate(label_text):
-                x = start_x + offset
-                if not (0 <= x < self.canvas_width):
-                    return False
+            end_x = start_x + len(label_text)
+            if start_x < 0 or end_x > self.canvas_width:
+                return False
+            row_start = y * self.canvas_width
+            if occupied.find(1, row_start + start_x, row_start + end_x) != -1:
+                return False
+            for x in range(start_x, end_x):
                 if canvas.get(x, y) != " ":
                     return False
-                if (x, y) in occupied:
-                    return False
             return True
 
         def place(start_x: int, y: int) -> None:
@@ -2065,42 +2344,40 @@ class Diagram:
         self,
         canvas: Canvas,
         edge: Edge,
-        hard_blocked: Set[Tuple[int, int]],
-        label_occupied: Set[Tuple[int, int]],
+        hard_blocked: bytearray,
+        label_occupied: bytearray,
+        nearest: Optional[Dict[int, Tuple[int, int]]] = None,
     ):
         source = edge.source
         target = edge.target
-        sx_center = source.x + source.box_width // 2
-        sy_center = source.y + source.height // 2
-        tx_center = target.x + target.box_width // 2
-        ty_center = target.y + target.height // 2
+        sx_center = source.center_x
+        sy_center = source.center_y
+        tx_center = target.center_x
+        ty_center = target.center_y
         dx = tx_center - sx_center
         dy = ty_center - sy_center
         prefer_horizontal = abs(dx) >= abs(dy)
 
         start_x, start_y, start_dir = self._edge_anchor(
-            source, target, True, prefer_horizontal
-        )
-        end_x, end_y, end_dir = self._edge_anchor(
-            target, source, False, prefer_horizontal
+            source, target, prefer_horizontal
         )
+        end_x, end_y, end_dir = self._edge_anchor(target, source, prefer_horizontal)
 
         edge_style = edge.style or self.connector_style
 
-        path_points = self._route_edge((start_x, start_y), (end_x, end_y), hard_blocked)
+        path_points = self._route_edge(
+            (start_x, start_y), (end_x, end_y), hard_blocked, nearest
+        )
         if not path_points:
             path_points = self._edge_path(
                 (start_x, start_y), (end_x, end_y), prefer_horizontal
             )
         path_points = self._simplify_path(path_points)
 
-        directions: List[Optional[str]] = []
-        for idx in range(len(path_points) - 1):
-            step_dir = self._direction_from_step(
-                path_points[idx + 1][0] - path_points[idx][0],
-                path_points[idx + 1][1] - path_points[idx][1],
-            )
-            directions.append(step_dir)
+        directions: List[Optional[str]] = [
+            _STEP_DIRECTIONS[(y1 > y0) - (y1 < y0) + 1][(x1 > x0) - (x1 < x0) + 1]
+            for (x0, y0), (x1, y1) in zip(path_points, path_points[1:])
+        ]
 
         problem_corners: Set[Tuple[int, int]] = set()
         for i in range(1, len(directions) - 1):
@@ -2131,288 +2408,368 @@ class Diagram:
 
         for point in path_points[1:]:
             self._reserve_edge_track(label_occupied, point)
-        for cell in label_cells:
-            self._reserve_edge_track(label_occupied, cell)
+        if label_cells:
+            self._reserve_edge_run(
+                label_occupied, label_cells[0][0], label_cells[-1][0], label_cells[0][1]
+            )
 
-        end_key = (end_x, end_y)
-        entry = self._edge_state.setdefault(
-            end_key, {"dirs": set(), "is_corner": False, "arrow": None}
-        )
-        if edge_style and not entry.get("style"):
-            entry["style"] = edge_style
-        if entry.get("arrow") is None:
-            entry["arrow"] = end_dir
-        else:
-            entry["dirs"].add(end_dir)
-            entry["dirs"].add(self._opposite_dir(end_dir))
+        styles = self._edge_styles
+        arrows = self._edge_arrows
+        index = self._edge_cell(end_x, end_y)
+        if index >= 0:
+            if edge_style and index not in styles:
+                styles[index] = edge_style
+            if not arrows[index]:
+                arrows[index] = _DIR_BITS[end_dir]
+            else:
+                self._edge_dirs[index] |= _AXIS_BITS[end_dir]
+            self._edge_track[index] = self._edge_dirs[index] | arrows[index]
         if edge.bidirectional:
-            start_key = (start_x, start_y)
-            entry_start = self._edge_state.setdefault(
-                start_key, {"dirs": set(), "is_corner": False, "arrow": None}
-            )
-            if edge_style and not entry_start.get("style"):
-                entry_start["style"] = edge_style
-            entry_start["arrow"] = self._opposite_dir(start_dir)
+            index = self._edge_cell(start_x, start_y)
+            if index >= 0:
+                if edge_style and index not in styles:
+                    styles[index] = edge_style
+                arrows[index] = _DIR_BITS[self._opposite_dir(start_dir)]
+                self._edge_track[index] = self._edge_dirs[index] | arrows[index]
+
+    def _reset_edge_state(self, adjacent: bytearray) -> None:
+        size = self.canvas_width * self.canvas_height
+        self._edge_dirs = bytearray(size)
+        self._edge_arrows = bytearray(size)
+        self._edge_flags = bytearray(size)
+        self._edge_track = bytearray(size)
+        self._edge_cost = bytearray(adjacent)
+        self._edge_corner_chars = {}
+        self._edge_styles = {}
+        self._edge_cells = []
+        self._edge_overflow = []
+
+    def _edge_cell(self, x: int, y: int) -> int:
+        width = self.canvas_width
+        height = self.canvas_height
+        if not (0 <= x < width and 0 <= y < height):
+            self._edge_overflow.append((x, y))
+            return -1
+        index = y * width + x
+        if not self._edge_flags[index]:
+            self._add_edge_cell(index)
+        return index
+
+    def _add_edge_cell(self, index: int) -> None:
+        width = self.canvas_width
+        y, x = divmod(index, width)
+        self._edge_flags[index] = _EDGE_PRESENT
+        self._edge_cells.append(index)
+        cost = self._edge_cost
+        if x > 0:
+            cost[index - 1] += _TRACK_PROXIMITY_PENALTY
+        if x < width - 1:
+            cost[index + 1] += _TRACK_PROXIMITY_PENALTY
+        if y > 0:
+            cost[index - width] += _TRACK_PROXIMITY_PENALTY
+        if y < self.canvas_height - 1:
+            cost[index + width] += _TRACK_PROXIMITY_PENALTY
 
     def _draw_edges(self, canvas: Canvas):
         if not self._edges:
             return
-        hard_blocked = self._build_edge_occupancy()
-        label_occupied = set(hard_blocked)
-        self._edge_state = {}
+        hard_blocked, adjacent, nearest = self._edge_occupancy()
+        label_occupied = bytearray(hard_blocked)
+        self._reset_edge_state(adjacent)
+        draw_edge = self._draw_edge
         for edge in self._edges:
-            self._draw_edge(canvas, edge, hard_blocked, label_occupied)
-        for (x, y), info in self._edge_state.items():
-            dirs = info.get("dirs", set())
-            style = info.get("style") or self.connector_style
-            if info.get("is_corner") and info.get("corner_char"):
-                self._set_connector_char(canvas, x, y, info["corner_char"], style)
+            draw_edge(canvas, edge, hard_blocked, label_occupied, nearest)
+        self._finalize_edges(canvas)
+
+    def _finalize_edges(self, canvas: Canvas) -> None:
+        chars = self.chars
+        glyphs = self._connector_glyphs()
+        arrow_glyphs = {
+            DIR_UP: chars.arrow_up,
+            DIR_DOWN: chars.arrow_down,
+            DIR_LEFT: chars.arrow_left,
+            DIR_RIGHT: chars.arrow_right,
+        }
+        width = self.canvas_width
+        edge_dirs = self._edge_dirs
+        edge_arrows = self._edge_arrows
+        corner_char = self._edge_corner_chars.get
+        edge_style = self._edge_styles.get
+        default_style = self.connector_style
+        set_char = canvas.set
+        style_tokens: Dict[str, Optional[Tuple[str, str]]] = {}
+        markup: List[Tuple[int, int, str, str]] = []
+        append = markup.append
+        for index in self._edge_cells:
+            char = corner_char(index)
+            if not char:
+                arrow = edge_arrows[index]
+                if arrow:
+                    char = arrow_glyphs[arrow]
+                else:
+                    dirs = edge_dirs[index]
+                    if not dirs:
+                        continue
+                    char = glyphs[dirs]
+            y, x = divmod(index, width)
+            set_char(x, y, char)
+            style = edge_style(index) or default_style
+            if not style:
                 continue
-            arrow_dir = info.get("arrow")
-            if arrow_dir:
-                self._draw_arrow(canvas, (x, y), arrow_dir, style)
-            elif dirs:
-                self._set_connector_char(canvas, x, y, self._dirs_to_char(dirs), style)
+            if style not in style_tokens:
+                style_tokens[style] = self._style_tokens(style)
+            tokens = style_tokens[style]
+            if tokens:
+                append((x, y, tokens[0], tokens[1]))
+        canvas.insert_markup_batch(markup)
+        if self._edge_overflow:
+            raise _overflow_error(*self._edge_overflow[0])
 
     def _draw_connector(
         self, canvas: Canvas, parent: Node, child: Node, position: Position
     ):
-        style = self.connector_style
-        if position == Position.BOTTOM:
-            p_x = parent.x + parent.box_width // 2
-            p_y = parent.y + parent.height
-
-            c_x = child.x + child.box_width // 2
-            c_y = child.y
+        self._connector_dispatch[position](canvas, parent, child)
+
+    def _sibling_groups(
+        self, parent: Node, position: Position
+    ) -> List[Tuple[int, List[Node]]]:
+        key = (parent, position)
+        groups = self._connector_groups.get(key)
+        if groups is not None:
+            return groups
+        top = position == Position.TOP
+        branch_groups: Dict[int, List[Node]] = {}
+        for child, child_position in parent.children:
+            if child_position != position:
+                continue
+            default = child.y + child.height if top else child.y - 1
+            branch_y = getattr(child, "branch_anchor_y", default)
+            branch_groups.setdefault(branch_y, []).append(child)
+        groups = [
+            (branch_y, sorted(branch_groups[branch_y], key=_node_center_x))
+            for branch_y in sorted(branch_groups, reverse=top)
+        ]
+        self._connector_groups[key] = groups
+        return groups
 
-            siblings = [c for c, pos in parent.children if pos == Position.BOTTOM]
+    def _draw_connector_bottom(self, canvas: Canvas, parent: Node, child: Node):
+        style = self.connector_style
+        arrow = self.chars.arrow_down
+        set_char = self._set_connector_char
+        write_dirs = self._write_dirs
+        p_x = parent.center_x
+        p_y = parent.y + parent.height
 
-            if len(siblings) == 1:
-                for y in range(p_y, c_y - 1):
-                    self._write_dirs(canvas, p_x, y, {"up", "down"})
-                self._set_connector_char(
-                    canvas, c_x, c_y - 1, self.chars.arrow_down, style
-                )
-            else:
-                branch_groups = {}
-                for s in siblings:
-                    branch_y = getattr(s, "branch_anchor_y", s.y - 1)
-                    branch_groups.setdefault(branch_y, []).append(s)
-
-                max_branch = max(branch_groups.keys())
-                for y in range(p_y, max_branch + 1):
-                    self._write_dirs(canvas, p_x, y, {"up", "down"})
-
-                for branch_y in sorted(branch_groups.keys()):
-                    row_children = sorted(
-                        branch_groups[branch_y], key=lambda n: n.x + n.box_width // 2
-                    )
-                    for child_node in row_children:
-                        center = child_node.x + child_node.box_width // 2
-                        if center > p_x:
-                            for x_pos in range(p_x + 1, center):
-                                self._write_dirs(
-                                    canvas, x_pos, branch_y, {"left", "right"}
-                                )
-                            self._write_dirs(canvas, p_x, branch_y, {"right"})
-                            self._write_dirs(canvas, center, branch_y, {"down", "left"})
-                        elif center < p_x:
-                            for x_pos in range(center + 1, p_x):
-                                self._write_dirs(
-                                    canvas, x_pos, branch_y, {"left", "right"}
-                                )
-                            self._write_dirs(canvas, p_x, branch_y, {"left"})
-                            self._write_dirs(
-                                canvas, center, branch_y, {"down", "right"}
-                            )
-                        else:
-                            self._write_dirs(canvas, p_x, branch_y, {"down"})
+        c_x = child.center_x
+        c_y = child.y
 
-                        s_y = child_node.y
-                        for y_pos in range(branch_y + 1, s_y - 1):
-                            self._write_dirs(canvas, center, y_pos, {"up", "down"})
-                        self._set_connector_char(
-                            canvas, center, s_y - 1, self.chars.arrow_down, style
-                        )
+        groups = self._sibling_groups(parent, Position.BOTTOM)
 
-        elif position == Position.RIGHT:
-            p_x = parent.x + parent.box_width
-            p_y = parent.y + parent.height // 2
+        if len(groups) == 1 and len(groups[0][1]) == 1:
+            for y in range(p_y, c_y - 1):
+                write_dirs(canvas, p_x, y, DIR_UP | DIR_DOWN)
+            set_char(canvas, c_x, c_y - 1, arrow, style)
+            return
 
-            c_x = child.x
-            c_y = child.y + child.height // 2
+        max_branch = groups[-1][0]
+        for y in range(p_y, max_branch + 1):
+            write_dirs(canvas, p_x, y, DIR_UP | DIR_DOWN)
+
+        for branch_y, row_children in groups:
+            for child_node in row_children:
+                center = child_node.center_x
+                if center > p_x:
+                    for x_pos in range(p_x + 1, center):
+                        write_dirs(canvas, x_pos, branch_y, DIR_LEFT | DIR_RIGHT)
+                    write_dirs(canvas, p_x, branch_y, DIR_RIGHT)
+                    write_dirs(canvas, center, branch_y, DIR_DOWN | DIR_LEFT)
+                elif center < p_x:
+                    for x_pos in range(center + 1, p_x):
+                        write_dirs(canvas, x_pos, branch_y, DIR_LEFT | DIR_RIGHT)
+                    write_dirs(canvas, p_x, branch_y, DIR_LEFT)
+                    write_dirs(canvas, center, branch_y, DIR_DOWN | DIR_RIGHT)
+                else:
+                    write_dirs(canvas, p_x, branch_y, DIR_DOWN)
 
-            if p_y == c_y:
-                for x in range(p_x, c_x - 1):
-                    self._set_connector_char(
-                        canvas, x, p_y, self.chars.horizontal, style
-                    )
-                self._set_connector_char(
-                    canvas, c_x - 1, c_y, self.chars.arrow_right, style
-                )
-            else:
-                corner_x = p_x + self.h_spacing // 2
+                s_y = child_node.y
+                for y_pos in range(branch_y + 1, s_y - 1):
+                    write_dirs(canvas, center, y_pos, DIR_UP | DIR_DOWN)
+                set_char(canvas, center, s_y - 1, arrow, style)
 
-                for x in range(p_x, corner_x):
-                    self._set_connector_char(
-                        canvas, x, p_y, self.chars.horizontal, style
-                    )
+    def _draw_connector_right(self, canvas: Canvas, parent: Node, child: Node):
+        style = self.connector_style
+        chars = self.chars
+        horizontal = chars.horizontal
+        vertical = chars.vertical
+        arrow = chars.arrow_right
+        set_char = self._set_connector_char
+        write_dirs = self._write_dirs
+        p_x = parent.x + parent.box_width
+        p_y = parent.center_y
+
+        c_x = child.x
+        c_y = child.center_y
+
+        if p_y == c_y:
+            for x in range(p_x, c_x - 1):
+                set_char(canvas, x, p_y, horizontal, style)
+            set_char(canvas, c_x - 1, c_y, arrow, style)
+            return
 
-                if c_y > p_y:
-                    self._write_dirs(canvas, corner_x, p_y, {"left", "down"}, style)
-                    for y in range(p_y + 1, c_y):
-                        self._set_connector_char(
-                            canvas, corner_x, y, self.chars.vertical, style
-                        )
-                    self._write_dirs(canvas, corner_x, c_y, {"up", "right"}, style)
-                else:
-                    self._write_dirs(canvas, corner_x, p_y, {"left", "up"}, style)
-                    for y in range(c_y + 1, p_y):
-                        self._set_connector_char(
-                            canvas, corner_x, y, self.chars.vertical, style
-                        )
-                    self._write_dirs(canvas, corner_x, c_y, {"down", "right"}, style)
+        corner_x = p_x + self.h_spacing // 2
 
-                for x in range(corner_x + 1, c_x - 1):
-                    self._set_connector_char(
-                        canvas, x, c_y, self.chars.horizontal, style
-                    )
-                self._set_connector_char(
-                    canvas, c_x - 1, c_y, self.chars.arrow_right, style
-                )
+        for x in range(p_x, corner_x):
+            set_char(canvas, x, p_y, horizontal, style)
 
-        elif position == Position.LEFT:
-            p_x = parent.x
-            p_y = parent.y + parent.height // 2
+        if c_y > p_y:
+            write_dirs(canvas, corner_x, p_y, DIR_LEFT | DIR_DOWN, style)
+            for y in range(p_y + 1, c_y):
+                set_char(canvas, corner_x, y, vertical, style)
+            write_dirs(canvas, corner_x, c_y, DIR_UP | DIR_RIGHT, style)
+        else:
+            write_dirs(canvas, corner_x, p_y, DIR_LEFT | DIR_UP, style)
+            for y in range(c_y + 1, p_y):
+                set_char(canvas, corner_x, y, vertical, style)
+            write_dirs(canvas, corner_x, c_y, DIR_DOWN | DIR_RIGHT, style)
 
-            c_x = child.x + child.box_width
-            c_y = child.y + child.height // 2
+        for x in range(corner_x + 1, c_x - 1):
+            set_char(canvas, x, c_y, horizontal, style)
+        set_char(canvas, c_x - 1, c_y, arrow, style)
 
-            if p_y == c_y:
-                for x in range(c_x + 1, p_x):
-                    self._set_connector_char(
-                        canvas, x, p_y, self.chars.horizontal, style
-                    )
-                self._set_connector_char(
-                    canvas, c_x + 1, c_y, self.chars.arrow_left, style
-                )
-            else:
-                corner_x = p_x - self.h_spacing // 2
+    def _draw_connector_left(self, canvas: Canvas, parent: Node, child: Node):
+        style = self.connector_style
+        chars = self.chars
+        horizontal = chars.horizontal
+        vertical = chars.vertical
+        arrow = chars.arrow_left
+        set_char = self._set_connector_char
+        write_dirs = self._write_dirs
+        p_x = parent.x
+        p_y = parent.center_y
+
+        c_x = child.x + child.box_width
+        c_y = child.center_y
+
+        if p_y == c_y:
+            for x in range(c_x + 1, p_x):
+                set_char(canvas, x, p_y, horizontal, style)
+            set_char(canvas, c_x + 1, c_y, arrow, style)
+            return
 
-                for x in range(corner_x + 1, p_x):
-                    self._set_connector_char(
-                        canvas, x, p_y, self.chars.horizontal, style
-                    )
+        corner_x = p_x - self.h_spacing // 2
 
-                if c_y > p_y:
-                    self._write_dirs(canvas, corner_x, p_y, {"right", "down"}, style)
-                    for y in range(p_y + 1, c_y):
-                        self._set_connector_char(
-                            canvas, corner_x, y, self.chars.vertical, style
-                        )
-                    self._write_dirs(canvas, corner_x, c_y, {"up", "left"}, style)
-                else:
-                    self._write_dirs(canvas, corner_x, p_y, {"right", "up"}, style)
-                    for y in range(c_y + 1, p_y):
-                        self._set_connector_char(
-                            canvas, corner_x, y, self.chars.vertical, style
-                        )
-                    self._write_dirs(canvas, corner_x, c_y, {"down", "left"}, style)
+        for x in range(corner_x + 1, p_x):
+            set_char(canvas, x, p_y, horizontal, style)
 
-                for x in range(c_x + 1, corner_x):
-                    self._set_connector_char(
-                        canvas, x, c_y, self.chars.horizontal, style
-                    )
-                self._set_connector_char(
-                    canvas, c_x + 1, c_y, self.chars.arrow_left, style
-                )
+        if c_y > p_y:
+            write_dirs(canvas, corner_x, p_y, DIR_RIGHT | DIR_DOWN, style)
+            for y in range(p_y + 1, c_y):
+                set_char(canvas, corner_x, y, vertical, style)
+            write_dirs(canvas, corner_x, c_y, DIR_UP | DIR_LEFT, style)
+        else:
+            write_dirs(canvas, corner_x, p_y, DIR_RIGHT | DIR_UP, style)
+            for y in range(c_y + 1, p_y):
+                set_char(canvas, corner_x, y, vertical, style)
+            write_dirs(canvas, corner_x, c_y, DIR_DOWN | DIR_LEFT, style)
 
-        elif position == Position.TOP:
-            p_x = parent.x + parent.box_width // 2
-            p_y = parent.y
+        for x in range(c_x + 1, corner_x):
+            set_char(canvas, x, c_y, horizontal, style)
+        set_char(canvas, c_x + 1, c_y, arrow, style)
 
-            siblings = [c for c, pos in parent.children if pos == Position.TOP]
-            branch_groups = {}
-            for s in siblings:
-                branch_y = getattr(s, "branch_anchor_y", s.y + s.height)
-                branch_groups.setdefault(branch_y, []).append(s)
+    def _draw_connector_top(self, canvas: Canvas, parent: Node, child: Node):
+        style = self.connector_style
+        arrow = self.chars.arrow_up
+        set_char = self._set_connector_char
+        write_dirs = self._write_dirs
+        p_x = parent.center_x
+        p_y = parent.y
 
-            if not branch_groups:
-                return
+        groups = self._sibling_groups(parent, Position.TOP)
 
-            min_branch = min(branch_groups.keys())
-            for y in range(p_y - 1, min_branch - 1, -1):
-                self._write_dirs(canvas, p_x, y, {"up", "down"})
+        if not groups:
+            return
 
-            for branch_y in sorted(branch_groups.keys(), reverse=True):
-                row_children = sorted(
-                    branch_groups[branch_y], key=lambda n: n.x + n.box_width // 2
-                )
-                for child_node in row_children:
-                    center = child_node.x + child_node.box_width // 2
-                    if center > p_x:
-                        for x_pos in range(p_x + 1, center):
-                            self._write_dirs(canvas, x_pos, branch_y, {"left", "right"})
-                        self._write_dirs(canvas, p_x, branch_y, {"right"})
-                        self._write_dirs(canvas, center, branch_y, {"up", "left"})
-                    elif center < p_x:
-                        for x_pos in range(center + 1, p_x):
-                            self._write_dirs(canvas, x_pos, branch_y, {"left", "right"})
-                        self._write_dirs(canvas, p_x, branch_y, {"left"})
-                        self._write_dirs(canvas, center, branch_y, {"up", "right"})
-                    else:
-                        self._write_dirs(canvas, p_x, branch_y, {"up"})
+        min_branch = groups[-1][0]
+        for y in range(p_y - 1, min_branch - 1, -1):
+            write_dirs(canvas, p_x, y, DIR_UP | DIR_DOWN)
+
+        for branch_y, row_children in groups:
+            for child_node in row_children:
+                center = child_node.center_x
+                if center > p_x:
+                    for x_pos in range(p_x + 1, center):
+                        write_dirs(canvas, x_pos, branch_y, DIR_LEFT | DIR_RIGHT)
+                    write_dirs(canvas, p_x, branch_y, DIR_RIGHT)
+                    write_dirs(canvas, center, branch_y, DIR_UP | DIR_LEFT)
+                elif center < p_x:
+                    for x_pos in range(center + 1, p_x):
+                        write_dirs(canvas, x_pos, branch_y, DIR_LEFT | DIR_RIGHT)
+                    write_dirs(canvas, p_x, branch_y, DIR_LEFT)
+                    write_dirs(canvas, center, branch_y, DIR_UP | DIR_RIGHT)
+                else:
+                    write_dirs(canvas, p_x, branch_y, DIR_UP)
 
-                    c_bottom_local = child_node.y + child_node.height - 1
-                    for y_pos in range(branch_y - 1, c_bottom_local, -1):
-                        self._write_dirs(canvas, center, y_pos, {"up", "down"})
-                    self._set_connector_char(
-                        canvas, center, c_bottom_local + 1, self.chars.arrow_up, style
-                    )
+                c_bottom_local = child_node.y + child_node.height - 1
+                for y_pos in range(branch_y - 1, c_bottom_local, -1):
+                    write_dirs(canvas, center, y_pos, DIR_UP | DIR_DOWN)
+                set_char(canvas, center, c_bottom_local + 1, arrow, style)
 
     def _draw_all_nodes(self, canvas: Canvas, node: Node):
-        self._draw_box(canvas, node)
-
-        for child, position in node.children:
-            self._draw_connector(canvas, node, child, position)
-            self._draw_all_nodes(canvas, child)
+        stack: List[Tuple[Node, Optional[Node], Optional[Position]]] = [
+            (node, None, None)
+        ]
+        self._connector_groups.clear()
+        while stack:
+            current, parent, position = stack.pop()
+            if parent is not None:
+                self._draw_connector(canvas, parent, current, position)
+            self._draw_box(canvas, current)
+            stack.extend(
+                (child, current, child_position)
+                for child, child_position in reversed(current.children)
+            )
 
     def _normalize_positions(self, node: Node, offset_x: int = 0, offset_y: int = 0):
-        min_x = min_y = float("inf")
-
-        def find_min(n: Node):
-            nonlocal min_x, min_y
-            min_x = min(min_x, n.x)
-            min_y = min(min_y, n.y)
-            for child, _ in n.children:
-                find_min(child)
-
-        find_min(node)
-
-        def shift(n: Node, dx: int, dy: int):
+        nodes = self._walk_subtree(node)
+        min_x = min(n.x for n in nodes)
+        min_y = min(n.y for n in nodes)
+        if min_x >= 0 and min_y >= 0:
+            return
+        dx = -min_x if min_x < 0 else 0
+        dy = -min_y if min_y < 0 else 0
+        for n in nodes:
             n.x += dx
             n.y += dy
             if n.branch_anchor_y is not None:
                 n.branch_anchor_y += dy
-            for child, _ in n.children:
-                shift(child, dx, dy)
 
-        if min_x < 0 or min_y < 0:
-            shift(node, abs(min_x) if min_x < 0 else 0, abs(min_y) if min_y < 0 else 0)
+    def _update_centers(self) -> None:
+        nodes = self._walk_subtree(self.root)
+        for edge in self._edges:
+            nodes.append(edge.source)
+            nodes.append(edge.target)
+        for node in nodes:
+            node.center_x = node.x + node.box_width // 2
+            node.center_y = node.y + node.height // 2
 
     def _compute_bounds(self, node: Node) -> Tuple[int, int, int, int]:
         min_x = node.x
         max_x = node.x + node.box_width - 1
         min_y = node.y
         max_y = node.y + node.height - 1
-
-        for child, _ in node.children:
-            c_min_x, c_max_x, c_min_y, c_max_y = self._compute_bounds(child)
-            min_x = min(min_x, c_min_x)
-            max_x = max(max_x, c_max_x)
-            min_y = min(min_y, c_min_y)
-            max_y = max(max_y, c_max_y)
-
+        for n in self._walk_subtree(node):
+            x = n.x
+            y = n.y
+            if x < min_x:
+                min_x = x
+            if y < min_y:
+                min_y = y
+            right = x + n.box_width - 1
+            if right > max_x:
+                max_x = right
+            bottom = y + n.height - 1
+            if bottom > max_y:
+                max_y = bottom
         return min_x, max_x, min_y, max_y
 
     def _validate_bounds(self, required_width: int, required_height: int):
@@ -2433,6 +2790,38 @@ class Diagram:
                 "or allow auto-sizing by leaving it unset."
             )
 
+    def _render_key(
+        self, include_markup: bool, layout_width: Optional[int]
+    ) -> Tuple[object, ...]:
+        return (
+            include_markup,
+            layout_width,
+            self._version,
+            astuple(self.chars),
+            self.connector_style,
+            self.max_box_width,
+            self.allow_intersections,
+            self.v_spacing,
+            self.h_spacing,
+            self._canvas_width_config,
+            self._canvas_height_config,
+            self._grid_min_nodes,
+            tuple(
+                (node.text, node.title, node.shape, node.position_from_parent)
+                for node in self._walk_subtree(self.root)
+            ),
+            tuple(
+                (
+                    id(edge.source),
+                    id(edge.target),
+                    edge.label,
+                    edge.bidirectional,
+                    edge.style,
+                )
+                for edge in self._edges
+            ),
+        )
+
     def render(self, include_markup: bool = False, fit_to_terminal: bool = True) -> str:
         original_layout_width = self._current_layout_width
         effective_layout_width = self.max_layout_width
@@ -2445,7 +2834,14 @@ class Diagram:
                     if effective_layout_width
                     else adjusted
                 )
+        key = self._render_key(include_markup, effective_layout_width)
+        cached = self._render_cache
+        if cached is not None and cached[0] == key:
+            return cached[1]
         self._current_layout_width = effective_layout_width
+        self._connector_maps_cache = None
+        self._corner_map_cache = None
+        self._connector_glyphs_cache = None
 
         original_canvas_width = self.canvas_width
         original_canvas_height = self.canvas_height
@@ -2453,6 +2849,7 @@ class Diagram:
         try:
             self._calculate_layout()
             self._normalize_positions(self.root)
+            self._update_centers()
             min_x, max_x, min_y, max_y = self._compute_bounds(self.root)
             content_width = max_x - min_x + 1
             content_height = max_y - min_y + 1
@@ -2476,10 +2873,16 @@ class Diagram:
             self.canvas_width = width
             self.canvas_height = height
 
-            canvas = Canvas(width=width, height=height)
+            canvas = self._canvas_pool
+            if canvas is not None and canvas.width == width and canvas.height == height:
+                canvas.clear()
+            else:
+                canvas = self._canvas_pool = Canvas(width=width, height=height)
             self._draw_all_nodes(canvas, self.root)
             self._draw_edges(canvas)
-            return canvas.render(crop=True, include_markup=include_markup)
+            text = canvas.render(crop=True, include_markup=include_markup)
+            self._render_cache = (key, text)
+            return text
         finally:
             self._current_layout_width = original_layout_width
             self.canvas_width = original_canvas_width
@@ -2508,10 +2911,12 @@ class Diagram:
                 if len(line) <= page_width:
                     wrapped.append(line)
                     continue
-                start = 0
-                while start < len(line):
-                    wrapped.append(line[start : start + page_width])
-                    start += page_width
+                wrapped.extend(
+                    [
+                        line[start : start + page_width]
+                        for start in range(0, len(line), page_width)
+                    ]
+                )
             lines = wrapped
 
         if not lines:
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from .diagram import Diagram
 from .node import Node
@@ -16,23 +16,35 @@ class DiffResult:
     removed_edges: List[Tuple[str, str]]
 
     def has_changes(self) -> bool:
-        return any(
-            [
-                self.added_nodes,
-                self.removed_nodes,
-                self.changed_nodes,
-                self.added_edges,
-                self.removed_edges,
-            ]
+        return bool(
+            self.added_nodes
+            or self.removed_nodes
+            or self.changed_nodes
+            or self.added_edges
+            or self.removed_edges
         )
 
 
 def _walk_nodes(
-    node: Node, path: Tuple[int, ...], mapping: Dict[Tuple[int, ...], Node]
-):
-    mapping[path] = node
-    for index, (child, _) in enumerate(node.children):
-        _walk_nodes(child, path + (index,), mapping)
+    root_a: Optional[Node], root_b: Optional[Node]
+) -> Iterator[Tuple[str, Optional[Node], Optional[Node]]]:
+    stack: List[Tuple[str, Optional[Node], Optional[Node]]] = [("", root_a, root_b)]
+    while stack:
+        path, node_a, node_b = stack.pop()
+        yield path, node_a, node_b
+        children_a = node_a.children if node_a is not None else []
+        children_b = node_b.children if node_b is not None else []
+        count_a = len(children_a)
+        count_b = len(children_b)
+        prefix = f"{path}->" if path else ""
+        for index in range(max(count_a, count_b) - 1, -1, -1):
+            stack.append(
+                (
+                    f"{prefix}{index}",
+                    children_a[index][0] if index < count_a else None,
+                    children_b[index][0] if index < count_b else None,
+                )
+            )
 
 
 def _walk_edges(diagram: Diagram) -> Iterable[Tuple[Node, Node]]:
@@ -41,37 +53,30 @@ def _walk_edges(diagram: Diagram) -> Iterable[Tuple[Node, Node]]:
 
 
 def diff(diagram_a: Diagram, diagram_b: Diagram) -> DiffResult:
-    mapping_a: Dict[Tuple[int, ...], Node] = {}
-    mapping_b: Dict[Tuple[int, ...], Node] = {}
-
-    _walk_nodes(diagram_a.root, (), mapping_a)
-    _walk_nodes(diagram_b.root, (), mapping_b)
-
     added_nodes: List[str] = []
     removed_nodes: List[str] = []
     changed_nodes: List[Tuple[str, str, str]] = []
 
-    all_keys = set(mapping_a.keys()).union(mapping_b.keys())
-    for key in sorted(all_keys):
-        node_a = mapping_a.get(key)
-        node_b = mapping_b.get(key)
-        identifier = "->".join(str(idx) for idx in key) or "root"
-        if node_a is None and node_b is not None:
-            added_nodes.append(identifier)
-        elif node_b is None and node_a is not None:
-            removed_nodes.append(identifier)
-        elif node_a and node_b and node_a.text != node_b.text:
-            changed_nodes.append((identifier, node_a.text, node_b.text))
-
-    def edge_key(source: Node, target: Node) -> Tuple[str, str, str]:
-        return (
-            getattr(source, "text", ""),
-            getattr(target, "text", ""),
-            f"{id(source)}->{id(target)}",
-        )
-
-    edges_a = {edge_key(src, dst) for src, dst in _walk_edges(diagram_a)}
-    edges_b = {edge_key(src, dst) for src, dst in _walk_edges(diagram_b)}
+    for path, node_a, node_b in _walk_nodes(diagram_a.root, diagram_b.root):
+        if node_a is None:
+            added_nodes.append(path or "root")
+        elif node_b is None:
+            removed_nodes.append(path or "root")
+        elif node_a.text != node_b.text:
+            changed_nodes.append((path or "root", node_a.text, node_b.text))
+
+    def edge_keys(diagram: Diagram) -> Set[Tuple[str, str, int]]:
+        seen: Dict[Tuple[str, str], int] = {}
+        keys: Set[Tuple[str, str, int]] = set()
+        for source, target in _walk_edges(diagram):
+            pair = (getattr(source, "text", ""), getattr(target, "text", ""))
+            occurrence = seen.get(pair, 0)
+            seen[pair] = occurrence + 1
+            keys.add((pair[0], pair[1], occurrence))
+        return keys
+
+    edges_a = edge_keys(diagram_a)
+    edges_b = edge_keys(diagram_b)
 
     added_edges = sorted(edges_b - edges_a)
     removed_edges = sorted(edges_a - edges_b)
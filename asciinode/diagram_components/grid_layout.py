@@ -63,5 +63,3 @@ class GridLayout:
                 node.branch_from = None
                 node.branch_row_index = 0
             current_y += row_heights[row_index] + self._vertical_spacing
-
-        self._diagram._normalize_positions(self._diagram.root)
@@ -11,15 +11,15 @@ class Node:
     def __init__(
         self, text: str, parent: Optional["Node"] = None, shape: Shape = Shape.RECTANGLE
     ) -> None:
-        self.text = text
+        self._text = text
         self.original_text = text
         self.parent = parent
         self.children: List[Tuple["Node", Position]] = []
+        self.child_nodes: List["Node"] = []
         self.position_from_parent: Optional[Position] = None
-        self.title: Optional[str] = None
+        self._box_title: Optional[str] = None
         self.title_tokens: List[Tuple[str, str, int]] = []
         self.diagram: Optional["Diagram"] = parent.diagram if parent else None
-        self.diagram: Optional["Diagram"] = parent.diagram if parent else None
         self.shape = shape
 
         self.x = 0
@@ -28,18 +28,55 @@ class Node:
         self.lines: List[str] = [text]
         self.height = 3
         self.box_width = len(text) + 4
+        self.center_x = self.box_width // 2
+        self.center_y = self.height // 2
         self.subtree_height = self.height
         self.subtree_min_x = 0
         self.subtree_max_x = self.box_width
         self.subtree_width = self.box_width
+        self.subtree_count = 1
         self.branch_row_index = 0
         self.branch_anchor_y: Optional[int] = None
         self.branch_from: Optional[Position] = None
+        self.pending_y_offset = 0
+        self.bottom_row_groups: List[List["Node"]] = []
+        self.top_row_groups: List[List["Node"]] = []
         self.tokens_lines: List[List[Tuple[str, str, int]]] = []
+        self._markup_tokens: Optional[Tuple[str, List[Tuple[str, str, int]]]] = None
         self.llm_enabled = False
         self.llm_query: Optional[str] = None
         self.llm_response: Optional[str] = None
         self.llm_system_prompt: Optional[str] = None
+        self._subtree_cache_valid = False
+        self._subtree_cache_key: Optional[Tuple[object, ...]] = None
+
+    def _invalidate_subtree_cache(self) -> None:
+        node: Optional[Node] = self
+        while node is not None and node._subtree_cache_valid:
+            node._subtree_cache_valid = False
+            node = node.parent
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @text.setter
+    def text(self, value: str) -> None:
+        self._text = value
+        self._invalidate_subtree_cache()
+        if self.diagram is not None:
+            self.diagram._version += 1
+
+    @property
+    def title(self) -> Optional[str]:
+        return self._box_title
+
+    @title.setter
+    def title(self, value: Optional[str]) -> None:
+        self._box_title = value
+        self._invalidate_subtree_cache()
+        if self.diagram is not None:
+            self.diagram._version += 1
 
     def add(
         self,
@@ -83,6 +120,10 @@ class Node:
             child.llm_system_prompt = None
 
         self.children.append((child, position))
+        self.child_nodes.append(child)
+        self._invalidate_subtree_cache()
+        if self.diagram is not None:
+            self.diagram._version += 1
         return child
 
     def add_bottom(self, text: str, **kwargs) -> "Node":
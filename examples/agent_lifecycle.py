@@ -1,5 +1,5 @@
 from time import sleep
-from typing import Dict, cast
+from typing import Dict, TypedDict
 
 from rich.align import Align
 from rich.live import Live
@@ -8,37 +8,44 @@ from rich.panel import Panel
 from asciinode.ascii_diagram import Diagram
 from asciinode.diagram_components.node import Node
 
+SYNC_START = "\x1b[?2026h"
+SYNC_END = "\x1b[?2026l"
 
-def _set_state(entry: Dict[str, object], status: str, color: str = "white", icon: str = "•") -> None:
-    node = cast(Node, entry["node"])
-    title = cast(str, entry["title"])
-    node.text = f"{title}\n[{color}]{icon} {status}[/{color}]"
+
+class NodeEntry(TypedDict):
+    node: Node
+    title: str
+
+
+def _set_state(entry: NodeEntry, status: str, color: str = "white", icon: str = "•") -> None:
+    entry["node"].text = f"{entry['title']}\n[{color}]{icon} {status}[/{color}]"
 
 
 def build_steps(diagram: Diagram):
     steps = []
-    ctx: Dict[str, Dict[str, object]] = {}
+    ctx: Dict[str, NodeEntry] = {}
 
-    def declare_node(key: str, node: Node, title: str, status: str, color: str = "grey50"):
+    def declare_node(key: str, node: Node, title: str, status: str, color: str = "grey50") -> Node:
         ctx[key] = {"node": node, "title": title}
         _set_state(ctx[key], status, color=color, icon="○")
+        return node
 
     steps.append(("Bootstrapping agent canvas", lambda: None))
 
     def step_structure():
         core = diagram.add_right("[bold cyan]Orchestrator[/bold cyan]")
-        declare_node("input", diagram.add_left("[bold white]Input Gateway[/bold white]"), "Input Gateway", "idle")
-        declare_node("analyzer", core.add_top("[bold yellow]Intent Analyzer[/bold yellow]"), "Intent Analyzer", "idle")
-        declare_node("planner", core.add_right("[bold green]Planner[/bold green]"), "Planner", "idle")
-        declare_node("executor", ctx["planner"]["node"].add_bottom("[bold magenta]Tool Executor[/bold magenta]"), "Tool Executor", "idle")
-        declare_node("knowledge", core.add_bottom("[bold blue]Knowledge Base[/bold blue]"), "Knowledge Base", "idle")
-        declare_node("output", ctx["planner"]["node"].add_right("[bold white]Response Stream[/bold white]"), "Response Stream", "idle")
-
-        diagram.connect(ctx["input"]["node"], ctx["analyzer"]["node"], label="parse prompt", style="[cyan]")
-        diagram.connect(ctx["analyzer"]["node"], ctx["planner"]["node"], label="intent", style="[yellow]")
-        diagram.connect(ctx["planner"]["node"], ctx["executor"]["node"], label="plan", style="[green]")
-        diagram.connect(ctx["executor"]["node"], ctx["knowledge"]["node"], label="fetch", style="[blue]")
-        diagram.connect(ctx["executor"]["node"], ctx["output"]["node"], label="result", style="[magenta]")
+        input_node = declare_node("input", diagram.add_left("[bold white]Input Gateway[/bold white]"), "Input Gateway", "idle")
+        analyzer_node = declare_node("analyzer", core.add_top("[bold yellow]Intent Analyzer[/bold yellow]"), "Intent Analyzer", "idle")
+        planner_node = declare_node("planner", core.add_right("[bold green]Planner[/bold green]"), "Planner", "idle")
+        executor_node = declare_node("executor", planner_node.add_bottom("[bold magenta]Tool Executor[/bold magenta]"), "Tool Executor", "idle")
+        knowledge_node = declare_node("knowledge", core.add_bottom("[bold blue]Knowledge Base[/bold blue]"), "Knowledge Base", "idle")
+        output_node = declare_node("output", planner_node.add_right("[bold white]Response Stream[/bold white]"), "Response Stream", "idle")
+
+        diagram.connect(input_node, analyzer_node, label="parse prompt", style="[cyan]")
+        diagram.connect(analyzer_node, planner_node, label="intent", style="[yellow]")
+        diagram.connect(planner_node, executor_node, label="plan", style="[green]")
+        diagram.connect(executor_node, knowledge_node, label="fetch", style="[blue]")
+        diagram.connect(executor_node, output_node, label="result", style="[magenta]")
 
         ctx["orchestrator"] = {"node": core, "title": "Agent Orchestrator"}
         _set_state(ctx["orchestrator"], "ready", color="grey66", icon="○")
@@ -92,6 +99,19 @@ def render_panel(diagram: Diagram, message: str) -> Panel:
     return Panel(body, title="Agent Live Monitor", subtitle=message, border_style="#888888")
 
 
+def present(live: Live, panel: Panel) -> None:
+    console = live.console
+    if not console.is_terminal:
+        live.update(panel, refresh=True)
+        return
+    console.file.write(SYNC_START)
+    try:
+        live.update(panel, refresh=True)
+    finally:
+        console.file.write(SYNC_END)
+        console.file.flush()
+
+
 def main():
     diagram = Diagram(
         "Agent Topology",
@@ -103,10 +123,10 @@ def main():
 
     steps = build_steps(diagram)
 
-    with Live(render_panel(diagram, "Initializing"), refresh_per_second=6) as live:
+    with Live(render_panel(diagram, "Initializing"), auto_refresh=False) as live:
         for message, action in steps:
             action()
-            live.update(render_panel(diagram, message))
+            present(live, render_panel(diagram, message))
             sleep(2)
 
 
@@ -21,5 +21,8 @@ setup(
         "requests>=2.31.0",
         "wcwidth>=0.2.6",
     ],
+    extras_require={
+        "speedups": ["orjson>=3.8"],
+    },
     include_package_data=True,
 )